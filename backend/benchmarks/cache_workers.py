@@ -0,0 +1,57 @@
+"""
+Cache hit ratio as worker count grows: N processes look up the same skewed key
+stream through make_cache(). The in-process backend warms once per worker; the
+SQLite-file and Redis-protocol backends warm once in total.
+"""
+import multiprocessing
+import os
+import random
+from time import perf_counter
+
+
+def _worker(env: dict, keys: int, lookups: int, seed: int) -> tuple[int, float]:
+    os.environ.update(env)
+    from core.cache import make_cache
+
+    cache = make_cache("bench", max_entries=keys)
+    rng = random.Random(seed)
+    hits = 0
+    start = perf_counter()
+    for _ in range(lookups):
+        key = str(min(int(rng.paretovariate(0.5)), keys))  # a few hot keys, long tail
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, {"key": key, "payload": "x" * 256})
+    return hits, perf_counter() - start
+
+
+def measure(env: dict, workers: int, keys: int = 2000, lookups: int = 5000) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers) as pool:
+        results = pool.starmap(_worker, [(env, keys, lookups, seed) for seed in range(workers)])
+    hits = sum(h for h, _ in results)
+    return {
+        "workers": workers,
+        "hit_ratio": round(hits / (workers * lookups), 3),
+        "us_per_lookup": round(sum(t for _, t in results) / (workers * lookups) * 1e6, 1),
+    }
+
+
+def run_cache_workers(workdir: str, worker_counts=(1, 4)) -> dict:
+    from benchmarks.fake_redis import FakeRedisServer
+
+    results = {}
+    with FakeRedisServer() as redis:
+        backends = {
+            "memory": {"CACHE_BACKEND": "memory"},
+            "sqlite": {"CACHE_BACKEND": "sqlite", "CACHE_SQLITE_PATH": f"{workdir}/cache-bench.db"},
+            "redis": {"CACHE_BACKEND": "redis", "CACHE_REDIS_URL": redis.url},
+        }
+        for name, env in backends.items():
+            for workers in worker_counts:
+                if name == "sqlite":
+                    env = {**env, "CACHE_SQLITE_PATH": f"{workdir}/cache-bench-{workers}.db"}
+                redis.store._data.clear()
+                results[f"{name}_x{workers}"] = measure(env, workers)
+    return results
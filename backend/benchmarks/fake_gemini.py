@@ -0,0 +1,39 @@
+"""
+Drop-in replacement for google.generativeai.GenerativeModel used by
+core/ai_response.py. Answers with diagnoses taken from namaste.csv after a
+configurable delay, and reports token usage like the real SDK.
+"""
+import csv
+import json
+import random
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+CSV_PATH = Path(__file__).resolve().parent.parent / "data" / "namaste.csv"
+
+
+class FakeGenerativeModel:
+    def __init__(self, latency_ms: float = 0, seed: int = 7):
+        self.latency_ms = latency_ms
+        self._random = random.Random(seed)
+        with open(CSV_PATH, newline="", encoding="utf-8") as f:
+            self._terms = [row["Traditional_Term"] for row in csv.DictReader(f) if row.get("Traditional_Term")]
+
+    def generate_content(self, contents, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        prompt = "".join(str(c) for c in contents)
+        picks = self._random.sample(self._terms, 3)
+        text = json.dumps([{"diagnosis": term, "reasoning": "Symptoms match the classical description."} for term in picks])
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4),
+        )
+
+
+def install(latency_ms: float = 0):
+    """Swap the module-level Gemini model in core.ai_response for the fake"""
+    from core import ai_response
+    ai_response.model = FakeGenerativeModel(latency_ms)
+    return ai_response.model
@@ -0,0 +1,144 @@
+"""
+Minimal Redis-protocol server for CACHE_BACKEND=redis without a Redis install:
+PING, GET, SET (EX/PX), MGET, DEL, over RESP2 (clients must not negotiate RESP3), in memory, with expiry.
+Not a Redis replacement; just enough for the cache backend and benchmarks.
+
+    python -m benchmarks.fake_redis --port 6399
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6399/0 uvicorn main:app --workers 4
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from benchmarks.fake_who import free_port
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at or None)
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def execute(self, args: list[bytes]):
+        command = args[0].upper()
+        if command == b"PING":
+            return "PONG"
+        if command == b"GET":
+            return self._get(args[1])
+        if command == b"MGET":
+            return [self._get(k) for k in args[1:]]
+        if command == b"SET":
+            expires_at = None
+            options = [a.upper() for a in args[3:]]
+            for i, option in enumerate(options):
+                if option in (b"EX", b"PX"):
+                    seconds = float(args[3 + i + 1]) / (1000 if option == b"PX" else 1)
+                    expires_at = time.time() + seconds
+            self._data[args[1]] = (args[2], expires_at)
+            return "OK"
+        if command == b"DEL":
+            return sum(self._data.pop(k, None) is not None for k in args[1:])
+        return Exception(f"unknown command '{command.decode()}'")
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return f"-ERR {value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode(v) for v in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes]:
+    header = await reader.readline()
+    if not header:
+        raise ConnectionResetError
+    count = int(header[1:])
+    args = []
+    for _ in range(count):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def _serve(store: FakeRedis, port: int, started: threading.Event, stop: asyncio.Event):
+    connections = set()
+
+    async def handle(reader, writer):
+        task = asyncio.current_task()
+        connections.add(task)
+        try:
+            while True:
+                writer.write(_encode(store.execute(await _read_command(reader))))
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            connections.discard(task)
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    started.set()
+    async with server:
+        await stop.wait()
+        # close client connections before the loop stops
+        for task in list(connections):
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+
+class FakeRedisServer:
+    """Runs the fake on its own event loop in a daemon thread"""
+
+    def __init__(self, port: int | None = None):
+        self.port = port or free_port()
+        self.store = FakeRedis()
+        self._started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._stop = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._stop = asyncio.Event()
+        self._loop.run_until_complete(_serve(self.store, self.port, self._started, self._stop))
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+    stop = threading.Event()
+    with FakeRedisServer(args.port):
+        print(f"Fake Redis listening on 127.0.0.1:{args.port}")
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,130 @@
+"""
+Local stand-in for the WHO ICD-11 API: OAuth token endpoint, entity search,
+MMS search and MMS entity lookups, with a configurable artificial latency.
+
+    python -m benchmarks.fake_who --port 8099 --latency-ms 80
+"""
+import argparse
+import asyncio
+import hashlib
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+app = FastAPI(title="Fake WHO ICD-11 API")
+app.state.latency_ms = 0.0
+app.state.token_latency_ms = 0.0
+
+ENTITY_BASE = "http://id.who.int/icd/entity"
+RESULTS_PER_SEARCH = 10
+
+
+def _entity_number(text: str) -> int:
+    return 1000000000 + int(hashlib.sha1(text.encode()).hexdigest()[:8], 16) % 900000000
+
+
+def _stem_code(n: int) -> str:
+    return f"{'ABCDEFGHJK'[n % 10]}{'ABCDEFGHJK'[(n // 10) % 10]}{n % 90 + 10}"
+
+
+async def _delay(ms: float):
+    if ms > 0:
+        await asyncio.sleep(ms / 1000)
+
+
+def _search_results(q: str, mms: bool):
+    results = []
+    for i in range(RESULTS_PER_SEARCH):
+        n = _entity_number(f"{q}:{i}")
+        item = {
+            "id": f"{ENTITY_BASE}/{n}",
+            "title": f"<em class='found'>{q}</em> variant {i}",
+            "score": round(1.0 - i * 0.05, 2),
+            "chapter": "26",
+        }
+        if mms:
+            item["theCode"] = _stem_code(n)
+        results.append(item)
+    return {"error": False, "resultChopped": False, "destinationEntities": results}
+
+
+@app.post("/connect/token")
+async def token():
+    await _delay(app.state.token_latency_ms)
+    return {"access_token": "fake-who-token", "expires_in": 3600, "token_type": "Bearer", "scope": "icdapi_access"}
+
+
+@app.get("/icd/entity/search")
+async def entity_search(q: str = ""):
+    await _delay(app.state.latency_ms)
+    return _search_results(q, mms=False)
+
+
+@app.get("/icd/release/11/{release}/mms/search")
+async def mms_search(release: str, q: str = ""):
+    await _delay(app.state.latency_ms)
+    return _search_results(q, mms=True)
+
+
+@app.get("/icd/release/11/{release}/mms/{entity_id}")
+@app.get("/icd/release/11/{entity_id}")
+async def mms_entity(entity_id: str, release: str | None = None):
+    await _delay(app.state.latency_ms)
+    n = int(entity_id) if entity_id.isdigit() else _entity_number(entity_id)
+    return {
+        "@id": f"{ENTITY_BASE}/{n}",
+        "title": {"@language": "en", "@value": f"Fake entity {n}"},
+        "code": _stem_code(n),
+        "classKind": "category",
+        "parent": [f"{ENTITY_BASE}/{n // 10}"],
+        "child": [f"{ENTITY_BASE}/{n * 10 + i}" for i in range(3)],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app under uvicorn in a daemon thread"""
+
+    def __init__(self, asgi_app, port: int | None = None):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def serve_fake_who(latency_ms: float = 0, token_latency_ms: float = 0, port: int | None = None) -> BackgroundServer:
+    app.state.latency_ms = latency_ms
+    app.state.token_latency_ms = token_latency_ms
+    return BackgroundServer(app, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    app.state.latency_ms = args.latency_ms
+    app.state.token_latency_ms = args.token_latency_ms
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
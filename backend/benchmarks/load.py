@@ -0,0 +1,108 @@
+"""
+Load scenarios, one or more per router, run against a live server.
+Each scenario reports p50/p95/p99 latency, throughput and error count.
+"""
+import asyncio
+import itertools
+import time
+import uuid
+
+import httpx
+
+API = "/api"
+CONDITION = {"patient_id": "bench-1", "namaste_code": "AY-EC-03", "namaste_display": "Jvara",
+             "icd_code": "MG26", "icd_display": "Fever"}
+
+
+def _bundle(size: int) -> dict:
+    run = uuid.uuid4().hex
+    return {"resourceType": "Bundle", "type": "collection", "entry": [
+        {"resource": {
+            "resourceType": "Condition",
+            "code": {"coding": [
+                {"system": "http://ayush.gov.in/namaste", "code": "AY-EF-02", "display": "Madhumeha"},
+                {"system": "http://id.who.int/icd/release/11/mms", "code": "5A11", "display": "Type 2 diabetes mellitus"},
+            ]},
+            "subject": {"reference": f"Patient/{run}-{n}"},
+        }} for n in range(size)
+    ]}
+
+
+# name -> (router, request factory returning (method, path, kwargs))
+_terms = itertools.cycle(["jv", "madhu", "fever", "siddha", "pit"])
+SCENARIOS = {
+    "autocomplete": ("terminology", lambda: ("GET", f"{API}/autocomplete-namaste", {"params": {"term": next(_terms)}})),
+    "translate": ("terminology", lambda: ("POST", f"{API}/translate/namaste-to-icd", {"json": {"namaste_code": "AY-EC-03", "namaste_display": "Fever"}})),
+    "icd_search": ("terminology", lambda: ("GET", f"{API}/search/fever", {})),
+    "icd_entity": ("terminology", lambda: ("GET", f"{API}/entity/1435254666", {})),
+    "generate_condition": ("conditions", lambda: ("POST", f"{API}/generate-fhir-condition", {"json": CONDITION})),
+    "generate_condition_batch": ("conditions", lambda: ("POST", f"{API}/generate-fhir-condition/batch", {"json": [CONDITION] * 50})),
+    "bundle_upload": ("conditions", lambda: ("POST", f"{API}/bundle-upload", {"json": _bundle(20)})),
+    "create_ai_job": ("ai", lambda: ("POST", f"{API}/create-namaste-job", {"json": {"symptoms": "fever with chills and body ache"}})),
+    "audit_logs": ("audit", lambda: ("GET", f"{API}/logs", {"params": {"limit": 50}})),
+    "code_usage": ("analytics", lambda: ("GET", f"{API}/analytics/code-usage", {})),
+    "users_me": ("users", lambda: ("GET", f"{API}/users/me", {"params": {"username": "bench"}})),
+    "login": ("auth", lambda: ("POST", f"{API}/token", {"data": {"username": "bench", "password": "bench-password"}})),
+    # last: each kick-off leaves an export of the whole table running, which would slow whatever came next
+    "bulk_export_kickoff": ("bulk-export", lambda: ("GET", f"{API}/$export", {})),
+}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def _run_scenario(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            method, path, kwargs = make_request()
+            start = time.perf_counter()
+            try:
+                res = await client.request(method, path, **kwargs)
+                if res.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "rps": round(requests / elapsed, 1),
+        "errors": errors,
+    }
+
+
+async def _login(client: httpx.AsyncClient) -> dict:
+    await client.post(f"{API}/register", json={"username": "bench", "password": "bench-password"})
+    res = await client.post(f"{API}/token", data={"username": "bench", "password": "bench-password"})
+    res.raise_for_status()
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+async def run_load(base_url: str, requests: int = 200, concurrency: int = 16, only: list[str] | None = None) -> dict:
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        client.headers.update(await _login(client))
+        # warm-up so first-request costs (imports, pool fill) stay out of the numbers
+        await client.post(f"{API}/bundle-upload", json=_bundle(20))
+        for name, (router, make_request) in SCENARIOS.items():
+            if only and name not in only:
+                continue
+            results[name] = {"router": router, **await _run_scenario(client, make_request, requests, concurrency)}
+    return results
@@ -0,0 +1,144 @@
+"""Micro-benchmarks for in-process hot paths. Numbers are microseconds per operation."""
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+
+def bench(fn, number: int, repeat: int = 5) -> dict:
+    """Run fn() `number` times per round; report best and median round as us/op"""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return {"us_per_op": round(min(rounds), 3), "median_us_per_op": round(statistics.median(rounds), 3)}
+
+
+def bench_autocomplete(number: int = 2000) -> dict:
+    from fastapi import Response
+    from core.terminology import TerminologyIndex
+    from core.namaste_snapshot import get_snapshot
+    from routers.terminology_router import autocomplete_namaste_term
+
+    terminology = TerminologyIndex(get_snapshot())
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(terminology=terminology)), headers={})
+    terms = ["jv", "madhu", "fever", "unani", "zzz-no-match"]
+    i = iter(range(10 ** 9))
+    return bench(lambda: autocomplete_namaste_term(terms[next(i) % len(terms)], request, Response(), 10, None), number)
+
+
+def _large_snapshot(rows: int = 20000):
+    """The real terminology plus `rows` synthetic terms, so scans cost what they would on a full code system"""
+    import csv
+    import random
+    from core.config import settings
+    from core.namaste_snapshot import NamasteSnapshot, build
+
+    with open(settings.NAMASTE_CSV_PATH, newline="", encoding="utf-8") as f:
+        real = list(csv.DictReader(f))
+    rng = random.Random(42)
+    syllables = ["ka", "ma", "dhu", "jva", "ra", "ni", "pa", "tta", "sha", "vi", "su", "ga", "lo", "ha", "ti", "na"]
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+    synthetic = [
+        {"NAMASTE_Code": f"SY-{n:05d}", "Traditional_Term": f"{word()} {word()}", "Biomedical_Term": f"{word()} disorder",
+         "System": rng.choice(["Ayurveda", "Siddha", "Unani"])}
+        for n in range(rows)
+    ]
+    return NamasteSnapshot(build(real + synthetic, "0" * 16))
+
+
+AUTOCOMPLETE_KEYSTROKES = [term[:n] for term in ["madhumeha", "jvara", "amlapitta"] for n in range(1, len(term) + 1)]
+
+
+def bench_autocomplete_session(number: int = 500, snapshot=None) -> dict:
+    """One op = one keystroke of a WebSocket session typing terms letter by letter"""
+    from core.autocomplete import AutocompleteSession
+
+    session = AutocompleteSession(snapshot or _large_snapshot())
+    i = iter(range(10 ** 9))
+    return bench(lambda: session.query(AUTOCOMPLETE_KEYSTROKES[next(i) % len(AUTOCOMPLETE_KEYSTROKES)], 10), number)
+
+
+def bench_autocomplete_rescan(number: int = 500, snapshot=None) -> dict:
+    """Same keystrokes answered by a fresh limited scan each time, the baseline the session has to beat"""
+    from core.utils import normalize_term
+
+    snapshot = snapshot or _large_snapshot()
+    i = iter(range(10 ** 9))
+
+    def keystroke():
+        q = normalize_term(AUTOCOMPLETE_KEYSTROKES[next(i) % len(AUTOCOMPLETE_KEYSTROKES)])
+        return [snapshot.row(r) for r in snapshot.search(q, 10)]
+
+    return bench(keystroke, number)
+
+
+ENTITY_WITH_CODE = {"code": "MG26", "title": {"@value": "Fever of other or unknown origin"}}
+ENTITY_WITH_CHILD = {"title": {"@value": "Fever"}, "children": [{"code": "bad"}, {"code": "1D01.0"}]}
+ENTITY_TITLE_ONLY = {"title": {"@value": "Influenza due to identified virus (1E30.0)"}, "parent": {"code": None}}
+ENTITY_NO_CODE = {"title": {"@value": "Nothing to find here"}}
+
+
+def bench_extract_icd11_code(number: int = 20000) -> dict:
+    from core.icd_client import extract_icd11_code
+
+    payloads = [ENTITY_WITH_CODE, ENTITY_WITH_CHILD, ENTITY_TITLE_ONLY, ENTITY_NO_CODE]
+    i = iter(range(10 ** 9))
+    return bench(lambda: extract_icd11_code(payloads[next(i) % len(payloads)]), number)
+
+
+def _condition_resource(patient_id: str) -> dict:
+    return {
+        "resourceType": "Condition",
+        "code": {"coding": [
+            {"system": "http://ayush.gov.in/namaste", "code": "AY-EC-03", "display": "Jvara"},
+            {"system": "http://id.who.int/icd/release/11/mms", "code": "MG26", "display": "Fever"},
+        ]},
+        "subject": {"reference": f"Patient/{patient_id}"},
+    }
+
+
+def bench_bundle_ingestion(number: int = 20, bundle_size: int = 100) -> dict:
+    """One op = storing and committing a bundle of `bundle_size` new Conditions"""
+    from core.condition_validation import validate_shard
+    from core.icd_graph import IcdGraph
+    from core.ingest import store_conditions
+    from core.namaste_snapshot import get_snapshot
+    from db.database import SessionLocal
+
+    db = SessionLocal()
+    snapshot, graph = get_snapshot(), IcdGraph()
+    try:
+        def ingest():
+            run = uuid.uuid4().hex
+            resources = [_condition_resource(f"{run}-{n}") for n in range(bundle_size)]
+            checked, _ = validate_shard(list(enumerate(resources)), snapshot, graph)
+            store_conditions(db, [(digest, resources[i], fields) for i, digest, fields in checked], "bench")
+            db.commit()
+        result = bench(ingest, number, repeat=3)
+    finally:
+        db.close()
+    result["bundle_size"] = bundle_size
+    return result
+
+
+def _autocomplete_keystrokes() -> dict:
+    snapshot = _large_snapshot()
+    return {
+        "autocomplete_session": bench_autocomplete_session(snapshot=snapshot),
+        "autocomplete_rescan": bench_autocomplete_rescan(snapshot=snapshot),
+    }
+
+
+def run_micro() -> dict:
+    return {
+        "autocomplete": bench_autocomplete(),
+        **_autocomplete_keystrokes(),
+        "extract_icd11_code": bench_extract_icd11_code(),
+        "bundle_ingestion": bench_bundle_ingestion(),
+    }
@@ -0,0 +1,149 @@
+"""
+Reproducible benchmark run: micro-benchmarks plus load scenarios against the
+API, with WHO ICD-11 and Gemini replaced by local stand-ins.
+
+Run from backend/ (or through the Makefile there):
+
+    python -m benchmarks.run --who-latency-ms 50 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression (make bench-check)
+
+benchmarks/baseline.json holds the results of a default run; numbers depend on
+the machine, so refresh it on the one that runs the check (make bench-baseline).
+
+A fresh SQLite database and export directory are created in a temp dir, so
+runs do not touch the configured database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _prepare_environment(workdir: str, who_url: str):
+    # must happen before anything imports core.config
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+        "EXPORT_DIR": f"{workdir}/exports",
+        "WHO_API_BASE": f"{who_url}/icd",
+        "WHO_TOKEN_URL": f"{who_url}/connect/token",
+        "LOG_LEVEL": "WARNING",
+        # load scenarios hammer one user; measure latency, not the limiter
+        "RATE_LIMIT_WHO_PER_MINUTE": "1000000",
+        "RATE_LIMIT_WHO_BURST": "1000000",
+        "RATE_LIMIT_AI_PER_MINUTE": "1000000",
+        "RATE_LIMIT_AI_BURST": "1000000",
+        "GEMINI_MAX_QUEUED": "1000",
+    })
+    for key in ("SECRET_KEY", "JWT_SECRET", "GEMINI_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    os.chdir(BACKEND_DIR)  # relative paths in settings (e.g. sqlite:///./x.db) resolve against backend/
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions: micro us_per_op or load p95_ms more than `tolerance` above baseline, tuned write throughput below it"""
+    regressions = []
+    for name, base in baseline.get("micro", {}).items():
+        current = results["micro"].get(name)
+        if current and current["us_per_op"] > base["us_per_op"] * (1 + tolerance):
+            regressions.append(f"micro/{name}: {current['us_per_op']}us > {base['us_per_op']}us")
+    for name, base in baseline.get("load", {}).items():
+        current = results["load"].get(name)
+        if current and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"load/{name}: p95 {current['p95_ms']}ms > {base['p95_ms']}ms")
+    base, current = baseline.get("writes", {}).get("tuned"), results.get("writes", {}).get("tuned")
+    if base and current and current["conditions_per_s"] < base["conditions_per_s"] * (1 - tolerance):
+        regressions.append(f"writes/tuned: {current['conditions_per_s']} conditions/s < {base['conditions_per_s']}")
+    return regressions
+
+
+def _print_table(results: dict):
+    print(f"{'micro':<28}{'us/op':>12}{'median':>12}")
+    for name, r in results["micro"].items():
+        print(f"{name:<28}{r['us_per_op']:>12}{r['median_us_per_op']:>12}")
+    print()
+    print(f"{'load':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}")
+    for name, r in results["load"].items():
+        print(f"{name:<28}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>10}{r['errors']:>8}")
+    if results.get("writes"):
+        print()
+        print(f"{'sqlite writes':<28}{'commits/s':>12}{'conds/s':>10}{'reads/s':>10}{'errors':>8}")
+        for name, r in results["writes"].items():
+            print(f"{name:<28}{r['commits_per_s']:>12}{r['conditions_per_s']:>10}{r['reads_per_s']:>10}{r['errors']:>8}")
+    if results.get("cache"):
+        print()
+        print(f"{'cache':<28}{'hit ratio':>12}{'us/lookup':>12}")
+        for name, r in results["cache"].items():
+            print(f"{name:<28}{r['hit_ratio']:>12}{r['us_per_lookup']:>12}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--who-latency-ms", type=float, default=50)
+    parser.add_argument("--token-latency-ms", type=float, default=20)
+    parser.add_argument("--gemini-latency-ms", type=float, default=200)
+    parser.add_argument("--requests", type=int, default=200, help="requests per load scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", nargs="*", help="load scenarios to run (default: all)")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--skip-writes", action="store_true")
+    parser.add_argument("--skip-cache", action="store_true")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fake_who import serve_fake_who, BackgroundServer
+
+    with tempfile.TemporaryDirectory(prefix="setu-bench-") as workdir, \
+            serve_fake_who(args.who_latency_ms, args.token_latency_ms) as who:
+        _prepare_environment(workdir, who.url)
+
+        from benchmarks import fake_gemini
+        from benchmarks.load import run_load
+        from benchmarks.micro import run_micro
+        from benchmarks.writes import run_writes
+        from benchmarks.cache_workers import run_cache_workers
+        from db.migrate import upgrade_to_head
+        import main as app_main
+
+        fake_gemini.install(args.gemini_latency_ms)
+        upgrade_to_head()
+
+        results = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "who_latency_ms": args.who_latency_ms,
+                "gemini_latency_ms": args.gemini_latency_ms,
+            },
+            "micro": {} if args.skip_micro else run_micro(),
+            "load": {},
+            "writes": {} if args.skip_writes else run_writes(workdir),
+            "cache": {} if args.skip_cache else run_cache_workers(workdir),
+        }
+        if not args.skip_load:
+            with BackgroundServer(app_main.app) as api:
+                results["load"] = asyncio.run(run_load(api.url, args.requests, args.concurrency, args.only))
+
+    _print_table(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
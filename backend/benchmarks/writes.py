@@ -0,0 +1,103 @@
+"""
+SQLite write throughput: concurrent bundle ingestion on the default connection
+settings with every writer committing directly ("default"), versus the WAL
+pragmas plus the serialized writer queue ("tuned"). A reader thread runs
+alongside to show whether reads stall behind writes.
+"""
+import threading
+import uuid
+from time import perf_counter
+
+
+def _ingest(db, run: str, bundle_size: int):
+    from benchmarks.micro import _condition_resource
+    from core.condition_validation import validate_shard
+    from core.icd_graph import IcdGraph
+    from core.ingest import store_conditions
+    from core.namaste_snapshot import get_snapshot
+
+    resources = [_condition_resource(f"{run}-{n}") for n in range(bundle_size)]
+    checked, _ = validate_shard(list(enumerate(resources)), get_snapshot(), IcdGraph())
+    store_conditions(db, [(digest, resources[i], fields) for i, digest, fields in checked], "bench")
+
+
+def measure(path: str, tuned: bool, writers: int, ops: int, bundle_size: int) -> dict:
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from db.database import Base, apply_sqlite_pragmas
+    from db.writer import WriteQueue
+    from models import model, job, analytics, idempotency, audit_logging  # noqa: F401 - register tables
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if tuned:
+        apply_sqlite_pragmas(engine)
+    Base.metadata.create_all(engine)  # throwaway database, no migrations needed
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    queue = WriteQueue(factory, workers=1) if tuned else None
+
+    errors, reads = 0, 0
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def commit_directly(run: str):
+        db = factory()
+        try:
+            _ingest(db, run, bundle_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def writer():
+        nonlocal errors
+        for _ in range(ops):
+            run = uuid.uuid4().hex
+            try:
+                if queue is not None:
+                    queue.run(_ingest, run, bundle_size)
+                else:
+                    commit_directly(run)
+            except OperationalError:  # "database is locked"
+                with lock:
+                    errors += 1
+
+    def reader():
+        nonlocal reads
+        with factory() as db:
+            while not done.is_set():
+                db.execute(select(func.count(audit_logging.Condition.id))).scalar()
+                db.rollback()  # end the read transaction so the next count sees new rows
+                reads += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    read_thread = threading.Thread(target=reader)
+    start = perf_counter()
+    read_thread.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = perf_counter() - start
+    done.set()
+    read_thread.join()
+    engine.dispose()
+
+    committed = writers * ops - errors
+    return {
+        "writers": writers,
+        "bundle_size": bundle_size,
+        "commits_per_s": round(committed / elapsed, 1),
+        "conditions_per_s": round(committed * bundle_size / elapsed, 1),
+        "reads_per_s": round(reads / elapsed, 1),
+        "errors": errors,
+    }
+
+
+def run_writes(workdir: str, writers: int = 8, ops: int = 25, bundle_size: int = 20) -> dict:
+    return {
+        mode: measure(f"{workdir}/writes-{mode}.db", mode == "tuned", writers, ops, bundle_size)
+        for mode in ("default", "tuned")
+    }
@@ -1,13 +1,10 @@
-import pandas as pd
+from core.namaste_snapshot import get_snapshot
 
-# Load the CSV (adjust the path)
-csv_path = "data/namaste.csv"
-df = pd.read_csv(csv_path)
-
-# Make a list of all possible diseases from the CSV
+# Make a list of all possible diseases from the NAMASTE snapshot
+snapshot = get_snapshot()
 disease_list = "\n".join(
     f"{row['NAMASTE_Code']} - {row['Traditional_Term']} / {row['Biomedical_Term']} ({row['System']})"
-    for _, row in df.iterrows()
+    for row in map(snapshot.row, range(len(snapshot)))
 )
 
 # Final prompt template
@@ -1,36 +1,89 @@
 import os
+import hashlib
 from datetime import datetime
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import google.generativeai as genai
 import json
+import logging
+import time
+from time import perf_counter
 
 from core.ai_prompt import PROMPT_TEMPLATE
 from core.diagnosis_lookup import get_codes_for_diagnosis
 from models.job import NamasteJob
+from db.database import SessionLocal
+from db.writer import write_queue
+from core.metrics import GEMINI_CALL_DURATION, GEMINI_TOKENS
+from core.cache import make_cache
+from core.config import settings
+from core.resilience import ConcurrencyLimiter
+from core.profiling import record_stage
+from core.tracing import Span, span, record_span
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
-model = genai.GenerativeModel("gemini-2.5-flash-lite")
+MODEL_NAME = "gemini-2.5-flash-lite"
+model = genai.GenerativeModel(MODEL_NAME)
+
+# jobs wait (without a timeout) for one of these slots; creation is refused once the wait queue is full
+gemini_limiter = ConcurrencyLimiter("gemini", settings.GEMINI_MAX_IN_FLIGHT, settings.GEMINI_MAX_QUEUED, queue_timeout=30.0)
+
+# validated results per (model, prompt template, normalized symptoms)
+ai_cache = make_cache("ai_response", max_entries=1000)
+
+logger = logging.getLogger(__name__)
+
+
+def _observe_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    GEMINI_TOKENS.labels("prompt").observe(getattr(usage, "prompt_token_count", 0) or 0)
+    GEMINI_TOKENS.labels("completion").observe(getattr(usage, "candidates_token_count", 0) or 0)
+
+
+def _cache_key(text: str) -> str:
+    symptoms = " ".join(text.lower().split())
+    # "result" marks entries holding the structured list (earlier entries held its JSON text)
+    return hashlib.sha256(f"{MODEL_NAME}\n{PROMPT_TEMPLATE}\n{symptoms}\nresult".encode()).hexdigest()
+
+
+def _update_job(db: Session, job_id: str, **values):
+    db.query(NamasteJob).filter(NamasteJob.job_id == job_id).update(values)
+
 
 class NamasteAiResponse:
 
     @classmethod
-    def generate(cls, db: Session, job_id: str, text: str) -> NamasteJob:
-        job = db.query(NamasteJob).filter(NamasteJob.job_id == job_id).first()
-        if not job:
-            raise ValueError("Job not found")
-
+    def run(cls, job_id: str, text: str, enqueued_ns: int = None):
+        """Background-task entry point; the request's session is closed by the time this runs"""
+        db = SessionLocal()
         try:
-            job.status = "processing"
-            db.commit()
+            cls.generate(db, job_id, text, enqueued_ns)
+        finally:
+            db.close()
 
-            prompt = PROMPT_TEMPLATE.format(symptoms=text)
+    @classmethod
+    def _ask_model(cls, job_id: str, text: str) -> tuple[list | None, str]:
+        """Model output mapped onto known NAMASTE codes: (validated results, raw text); results are None when unparseable"""
+        prompt = PROMPT_TEMPLATE.format(symptoms=text)
 
-            response = model.generate_content(contents=[prompt])
-            ai_text = response.text.strip() if response and response.text else "No response generated"
+        waiting = time.time_ns()
+        with gemini_limiter.slot(timeout=None):
+            record_span("gemini.slot_wait", waiting, job_id=job_id)
+            with span("gemini.generate_content", "client", model=MODEL_NAME, job_id=job_id):
+                start = perf_counter()
+                try:
+                    response = model.generate_content(contents=[prompt])
+                finally:
+                    GEMINI_CALL_DURATION.observe(perf_counter() - start)
+                    record_stage("upstream", perf_counter() - start)
+        _observe_usage(response)
+        ai_text = response.text.strip() if response and response.text else "No response generated"
 
+        with span("job.validate", job_id=job_id) as s:
             try:
                 parsed = json.loads(ai_text)
                 validated_results = []
@@ -43,19 +96,53 @@ class NamasteAiResponse:
                             "ICD/TM": codes["ICD/TM"],
                             "Biomedical": codes["Biomedical"]
                         })
-                ai_text = json.dumps(validated_results)
+                if s is not None:
+                    s.attributes.update(suggested=len(parsed), validated=len(validated_results))
+                return validated_results, ai_text
             except Exception as e:
-                print(f"⚠️ AI output parsing error: {e}")
+                logger.warning("AI output parsing error", extra={"job_id": job_id, "error": str(e)})
+                if s is not None:
+                    s.status, s.attributes["error"] = "error", str(e)
+                return None, ai_text
+
+    @classmethod
+    def generate(cls, db: Session, job_id: str, text: str, enqueued_ns: int = None) -> NamasteJob:
+        job = db.query(NamasteJob).filter(NamasteJob.job_id == job_id).first()
+        if not job:
+            raise ValueError("Job not found")
+
+        # continue the trace of the request that created the job
+        parent = Span.remote(job.traceparent)
+        # hand the connection back while the job waits on the model and the writer queue (which needs one of its own);
+        # with a full pool the writer would otherwise starve behind the jobs waiting on it
+        db.rollback()
+        with span("job.generate", parent=parent, root=True, job_id=job_id) as s:
+            if enqueued_ns and s is not None:
+                record_span("job.queue_wait", enqueued_ns, s.start_ns, parent=parent or s, job_id=job_id)
+
+            # status updates go through the writer queue; this session only reads
+            try:
+                write_queue.run(_update_job, job_id, status="processing")
+
+                # identical symptoms are answered from the cache (shared across workers) without a model call
+                cache_key = _cache_key(text)
+                result, ai_text = ai_cache.get(cache_key), None
+                if s is not None:
+                    s.attributes["cache_hit"] = result is not None
+                if result is None:
+                    result, ai_text = cls._ask_model(job_id, text)
+                    if result is not None:
+                        ai_cache.set(cache_key, result, ttl=settings.AI_CACHE_TTL_SECONDS)
 
-            job.status = "completed"
-            job.prompt = ai_text
-            job.completed_at = datetime.utcnow()
-            db.commit()
+                # structured results when validated, otherwise the raw text for inspection
+                with span("job.store", job_id=job_id):
+                    write_queue.run(_update_job, job_id, status="completed", result=result,
+                                    prompt=ai_text if result is None else None, completed_at=datetime.utcnow())
 
-        except Exception as e:
-            job.status = "failed"
-            job.error = str(e)
-            job.completed_at = datetime.utcnow()
-            db.commit()
+            except Exception as e:
+                if s is not None:
+                    s.status, s.attributes["error"] = "error", str(e)
+                write_queue.run(_update_job, job_id, status="failed", error=str(e), completed_at=datetime.utcnow())
 
+        db.refresh(job)
         return job
@@ -0,0 +1,107 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from core.diagnosis_lookup import get_system_for_code
+from models.analytics import CodeUsageStat
+from models.audit_logging import Condition
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = "all"
+DIMENSIONS = ("namaste", "pair", "system")
+
+
+def _usage_keys(namaste_code, icd_code):
+    """(dimension, key) pairs a single Condition contributes to"""
+    if namaste_code:
+        yield "namaste", namaste_code
+        system = get_system_for_code(namaste_code)
+        if system:
+            yield "system", system
+        if icd_code:
+            yield "pair", f"{namaste_code}|{icd_code}"
+
+
+def _count(rows: Iterable) -> Counter:
+    """rows: (namaste_code, icd_code, created_at) tuples"""
+    counts = Counter()
+    for namaste_code, icd_code, created_at in rows:
+        day = (created_at or datetime.utcnow()).date().isoformat()
+        for dimension, key in _usage_keys(namaste_code, icd_code):
+            counts[(dimension, key, ALL_TIME)] += 1
+            counts[(dimension, key, day)] += 1
+    return counts
+
+
+def _upsert_counts(db: Session, counts: Counter):
+    if not counts:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    rows = [{"dimension": d, "key": k, "bucket": b, "count": n} for (d, k, b), n in counts.items()]
+    # chunked to stay under the bound-parameter limit of multi-row VALUES
+    for i in range(0, len(rows), 500):
+        stmt = insert(CodeUsageStat).values(rows[i:i + 500])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dimension", "key", "bucket"],
+            set_={"count": CodeUsageStat.count + stmt.excluded["count"]},
+        )
+        db.execute(stmt)
+
+
+def record_code_usage(db: Session, conditions: Iterable[Condition]):
+    """Add freshly stored Conditions to the aggregates. Runs inside the caller's transaction."""
+    _upsert_counts(db, _count((c.namaste_code, c.icd_code, c.created_at) for c in conditions))
+
+
+def backfill_code_usage(db: Session, batch_size: int = 5000):
+    """One-time rebuild from the conditions table, used when the aggregate table is empty"""
+    if db.query(CodeUsageStat).first() is not None:
+        return
+    if not db.query(func.count(Condition.id)).scalar():
+        return
+
+    stmt = select(Condition.namaste_code, Condition.icd_code, Condition.created_at).execution_options(
+        stream_results=True, yield_per=batch_size
+    )
+    counts = _count(db.execute(stmt))
+    _upsert_counts(db, counts)
+    db.commit()
+    logger.info("Backfilled code usage aggregates: %d counters", len(counts))
+
+
+def top_codes(db: Session, dimension: str, k: int, bucket: str = ALL_TIME):
+    rows = (
+        db.query(CodeUsageStat.key, CodeUsageStat.count)
+        .filter(CodeUsageStat.dimension == dimension, CodeUsageStat.bucket == bucket)
+        .order_by(CodeUsageStat.count.desc())
+        .limit(k)
+        .all()
+    )
+    return [{"key": key, "count": count} for key, count in rows]
+
+
+def daily_counts(db: Session, dimension: str, keys: list[str], start_day: str, end_day: str):
+    if not keys:
+        return []
+    rows = (
+        db.query(CodeUsageStat.bucket, CodeUsageStat.key, CodeUsageStat.count)
+        .filter(
+            CodeUsageStat.dimension == dimension,
+            CodeUsageStat.key.in_(keys),
+            CodeUsageStat.bucket != ALL_TIME,
+            CodeUsageStat.bucket >= start_day,
+            CodeUsageStat.bucket <= end_day,
+        )
+        .order_by(CodeUsageStat.bucket)
+        .all()
+    )
+    return [{"bucket": bucket, "key": key, "count": count} for bucket, key, count in rows]
@@ -4,9 +4,12 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from models import model
+from core.config import settings
+from core.profiling import stage
 import os
 
 # ================= CONFIG =================
@@ -37,33 +40,53 @@ def decode_access_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
+async def user_from_token(token: str, db: AsyncSession) -> Optional[model.User]:
+    """The user a bearer token belongs to, or None; for callers outside the HTTP dependency (WebSockets)"""
+    payload = decode_access_token(token)
+    username = payload.get("sub") if payload else None
+    if username is None:
+        return None
+    return await db.scalar(select(model.User).where(model.User.username == username))
+
 # ================= CURRENT USER DEPENDENCY =================
 bearer_scheme = HTTPBearer()
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> model.User:
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    username: str = payload.get("sub")
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = db.query(model.User).filter(model.User.username == username).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    with stage("auth"):
+        token = credentials.credentials
+        payload = decode_access_token(token)
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        username: str = payload.get("sub")
+        if username is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user = await db.scalar(select(model.User).where(model.User.username == username))
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user
+
+
+# ================= ADMIN =================
+def is_admin(username: Optional[str]) -> bool:
+    return username in {name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip()}
+
+
+async def require_admin(user: model.User = Depends(get_current_user)) -> model.User:
+    if not is_admin(user.username):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return user
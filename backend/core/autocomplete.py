@@ -0,0 +1,39 @@
+from core.namaste_snapshot import NamasteSnapshot
+from core.utils import normalize_term
+
+# candidate sets up to this many rows are kept and narrowed; larger ones are cheaper to rescan
+NARROW_MAX_ROWS = 128
+# shorter queries match too much of the terminology for their full match set to be worth collecting
+NARROW_MIN_LENGTH = 3
+
+
+class AutocompleteSession:
+    """
+    Per-connection autocomplete state. Every row matching a query also matches
+    any query it contains, so once a query has at most NARROW_MAX_ROWS matches
+    the whole set is kept, and following keystrokes that extend the query
+    narrow that set instead of rescanning the terminology. Broad queries are
+    plain scans that stop after `limit` hits.
+    """
+
+    def __init__(self, snapshot: NamasteSnapshot):
+        self.snapshot = snapshot
+        self._q = None  # query whose complete match set is self._rows
+        self._rows = []
+
+    def _matches(self, q: str, limit: int) -> list[int]:
+        if self._q is not None and self._q in q:
+            if q != self._q:
+                self._rows = self.snapshot.narrow(self._rows, q)
+                self._q = q
+            return self._rows[:limit]
+        self._q = None
+        if len(q) < NARROW_MIN_LENGTH:
+            return self.snapshot.search(q, limit)
+        found = self.snapshot.search(q, max(limit, NARROW_MAX_ROWS + 1))
+        if len(found) <= NARROW_MAX_ROWS:
+            self._q, self._rows = q, found
+        return found[:limit]
+
+    def query(self, term: str, limit: int = 10) -> list[dict]:
+        return [self.snapshot.row(i) for i in self._matches(normalize_term(term), limit)]
@@ -0,0 +1,128 @@
+import gzip
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import orjson
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.database import SessionLocal
+from db.writer import write_queue
+from models.audit_logging import Condition
+from models.job import BulkExportJob
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = "application/fhir+ndjson"
+SUPPORTED_OUTPUT_FORMATS = {"application/fhir+ndjson", "application/ndjson", "ndjson"}
+SUPPORTED_TYPES = {"Condition"}
+
+
+def export_dir(job_id: str) -> str:
+    return os.path.join(settings.EXPORT_DIR, job_id)
+
+
+def remove_export_files(job_id: str):
+    shutil.rmtree(export_dir(job_id), ignore_errors=True)
+
+
+class _NdjsonChunkWriter:
+    """Writes NDJSON lines, rolling over to a new file once EXPORT_MAX_FILE_BYTES is reached"""
+
+    def __init__(self, directory: str, resource_type: str, compress: bool):
+        self.directory = directory
+        self.resource_type = resource_type
+        self.compress = compress
+        self.files = []  # [{"type", "file", "count"}]
+        self._fh = None
+        self._bytes = 0
+
+    def _open_next(self):
+        self.close()
+        name = f"{self.resource_type}-{len(self.files) + 1}.ndjson"
+        if self.compress:
+            name += ".gz"
+            self._fh = gzip.open(os.path.join(self.directory, name), "wb")
+        else:
+            self._fh = open(os.path.join(self.directory, name), "wb")
+        self._bytes = 0
+        self.files.append({"type": self.resource_type, "file": name, "count": 0})
+
+    def write(self, resource: dict):
+        line = orjson.dumps(resource) + b"\n"
+        if self._fh is None or self._bytes + len(line) > settings.EXPORT_MAX_FILE_BYTES:
+            self._open_next()
+        self._fh.write(line)
+        self._bytes += len(line)
+        self.files[-1]["count"] += 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _update_job(db: Session, job_id: str, **values):
+    db.query(BulkExportJob).filter(BulkExportJob.job_id == job_id).update(values)
+
+
+def run_bulk_export(job_id: str):
+    """
+    Background task: stream stored Conditions into NDJSON files.
+    Rows are read through a server-side cursor in EXPORT_FETCH_SIZE batches,
+    so memory stays flat no matter how large the conditions table is.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(BulkExportJob).filter(BulkExportJob.job_id == job_id).first()
+        if not job:
+            logger.warning("Bulk export job %s not found", job_id)
+            return
+        # status updates go through the writer queue, which needs a connection of its own: keep the
+        # loaded job and hand this session's connection back while waiting on the writer
+        db.expunge(job)
+        db.rollback()
+        write_queue.run(_update_job, job_id, status="processing")
+
+        directory = export_dir(job_id)
+        os.makedirs(directory, exist_ok=True)
+        writer = _NdjsonChunkWriter(directory, job.resource_type, job.compress)
+
+        try:
+            stmt = (
+                select(Condition.id, Condition.raw_fhir)
+                .where(Condition.created_at <= job.transaction_time)
+                .execution_options(stream_results=True, yield_per=settings.EXPORT_FETCH_SIZE)
+            )
+            if job.since:
+                stmt = stmt.where(Condition.created_at > job.since)
+
+            # no commits while the cursor is open: on PostgreSQL that would close it
+            exported = 0
+            for partition in db.execute(stmt).partitions():
+                for row_id, raw in partition:
+                    if not raw:
+                        continue
+                    writer.write(raw if raw.get("id") else {**raw, "id": row_id})
+                    exported += 1
+        finally:
+            writer.close()
+        db.rollback()  # done reading
+
+        write_queue.run(
+            _update_job, job_id,
+            status="completed", exported_count=exported, output=writer.files, completed_at=datetime.utcnow(),
+        )
+        logger.info("Bulk export %s completed: %d resources in %d file(s)", job_id, exported, len(writer.files))
+
+    except Exception as e:
+        db.rollback()
+        logger.exception("Bulk export %s failed", job_id)
+        write_queue.run(_update_job, job_id, status="failed", error=str(e), completed_at=datetime.utcnow())
+        remove_export_files(job_id)
+    finally:
+        db.close()
@@ -0,0 +1,226 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+import orjson
+
+from core.config import settings
+from core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+# ================= BACKENDS =================
+# Backends store bytes under string keys with an optional TTL in seconds.
+# get_many/set_many exist so remote backends can batch round trips.
+class MemoryBackend:
+    """Per-process LRU; fastest, but every worker holds its own copy"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteBackend:
+    """
+    File-backed cache shared by every worker on one host and kept across restarts.
+    WAL mode lets workers read while one writes; expired and excess rows are
+    pruned every `prune_every` writes.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, prune_every: int = 500):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {}
+        conn = self._conn()
+        now = time.time()
+        # stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (*chunk, now),
+            )
+            found.update(rows)
+        return found
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            [(key, value, expires_at) for key, value in items.items()],
+        )
+        self._writes += len(items)
+        if self._writes >= self.prune_every:
+            self._writes = 0
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        # INSERT OR REPLACE gives rewritten keys a new rowid, so low rowids are the least recently written
+        conn.execute(
+            "DELETE FROM cache WHERE rowid <= (SELECT rowid FROM cache ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    """
+    Any server speaking the Redis protocol (Redis, Valkey, KeyDB, or the local
+    stand-in in benchmarks/fake_redis.py); shared across workers and hosts.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        # RESP2: understood by every Redis-protocol server, not only those with HELLO/RESP3
+        self._client = redis.Redis.from_url(url, protocol=2, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        return {key: value for key, value in zip(keys, self._client.mget(keys)) if value is not None}
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, px=int(ttl * 1000) if ttl else None)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+
+_shared_backend = None
+_shared_lock = threading.Lock()
+
+
+def _backend_for(max_entries: int):
+    global _shared_backend
+    kind = settings.CACHE_BACKEND
+    if kind == "memory":
+        # one LRU per cache so a large cache cannot evict a small one
+        return MemoryBackend(max_entries)
+    with _shared_lock:
+        if _shared_backend is None:
+            if kind == "sqlite":
+                _shared_backend = SQLiteBackend(settings.CACHE_SQLITE_PATH)
+            elif kind == "redis":
+                _shared_backend = RedisBackend(settings.CACHE_REDIS_URL)
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+        return _shared_backend
+
+
+# ================= CACHE =================
+class Cache:
+    """
+    Named view over a backend: keys are prefixed with the cache name, values are
+    JSON-encoded with orjson, and hits/misses are counted per cache. Backend
+    errors are logged and treated as misses, so a cache outage only costs latency.
+    """
+
+    def __init__(self, name: str, backend):
+        self.name = name
+        self.backend = backend
+        self._prefix = f"{name}:"
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        keys = list(keys)
+        try:
+            raw = self.backend.get_many([self._prefix + k for k in keys])
+        except Exception as e:
+            logger.warning("Cache read failed", extra={"cache": self.name, "error": str(e)})
+            raw = {}
+        found = {}
+        for key in keys:
+            value = raw.get(self._prefix + key)
+            record_cache(self.name, value is not None)
+            if value is not None:
+                found[key] = orjson.loads(value)
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: dict, ttl: Optional[float] = None):
+        try:
+            self.backend.set_many({self._prefix + k: orjson.dumps(v) for k, v in items.items()}, ttl)
+        except Exception as e:
+            logger.warning("Cache write failed", extra={"cache": self.name, "error": str(e)})
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete(self._prefix + key)
+        except Exception as e:
+            logger.warning("Cache delete failed", extra={"cache": self.name, "error": str(e)})
+
+
+def make_cache(name: str, max_entries: int = 10000) -> Cache:
+    """Cache on the configured backend (CACHE_BACKEND); `max_entries` bounds the in-process LRU"""
+    return Cache(name, _backend_for(max_entries))
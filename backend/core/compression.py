@@ -0,0 +1,103 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from core.config import settings
+
+COMPRESSIBLE_TYPES = ("application/json", "application/fhir+json", "application/ndjson", "application/xml", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Best coding the client accepts: br when available, then gzip; q=0 excludes"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for name in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=4)  # close to gzip's speed at a better ratio
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete (single-message) responses of at least
+    `minimum_size` bytes with brotli or gzip. Streamed responses pass through
+    untouched, and a strong ETag gets the coding appended so compressed and
+    identity copies never share a validator.
+    """
+
+    def __init__(self, app, minimum_size: int = settings.COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            # first body message: decide with the whole body in hand, or give up if it streams
+            passthrough = True
+            body = message.get("body", b"")
+            headers = list(start["headers"])
+            names = {k.lower() for k, _ in headers}
+            content_type = next((v.decode("latin-1") for k, v in headers if k.lower() == b"content-type"), "")
+            if (
+                message.get("more_body")
+                or b"content-encoding" in names
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                return await send(message)
+
+            body = compress(body, encoding)
+            rewritten = [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+            has_vary = False
+            for k, v in headers:
+                key = k.lower()
+                if key == b"content-length":
+                    continue
+                if key == b"etag" and v.endswith(b'"') and not v.startswith(b"W/"):
+                    v = v[:-1] + f'-{encoding}"'.encode()
+                elif key == b"vary":
+                    has_vary = True
+                    if b"accept-encoding" not in v.lower():
+                        v += b", Accept-Encoding"
+                rewritten.append((k, v))
+            if not has_vary:
+                rewritten.append((b"vary", b"Accept-Encoding"))
+            await send({**start, "headers": rewritten})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,103 @@
+import logging
+import re
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.icd_graph import IcdGraph, ICD_STEM_SEPARATORS
+from core.namaste_snapshot import NamasteSnapshot
+from core.utils import content_hash
+
+logger = logging.getLogger(__name__)
+
+# relative or absolute literal reference to a Patient, or a bundle-internal urn:uuid
+PATIENT_REFERENCE = re.compile(r"^(?:\S+/)?Patient/[A-Za-z0-9\-.]{1,64}$|^urn:uuid:[0-9a-fA-F\-]{36}$")
+
+
+def _issue(code: str, diagnostics: str, expression: str) -> dict:
+    return {"severity": "error", "code": code, "diagnostics": diagnostics, "expression": [expression]}
+
+
+def _icd_known(graph: IcdGraph, code: str) -> bool:
+    if not len(graph):
+        return True  # no local release loaded, nothing to check against
+    return all(graph.find(stem) is not None for stem in ICD_STEM_SEPARATORS.split(code) if stem)
+
+
+# ================= SINGLE RESOURCE =================
+def check_condition(res: dict, path: str, snapshot: NamasteSnapshot, graph: IcdGraph) -> tuple[Optional[dict], list[dict]]:
+    """
+    Validate one Condition and extract the fields stored for it, in one pass
+    over its codings. Returns (fields, []) when valid, else (None, issues);
+    issues are OperationOutcome.issue entries pointing at `path`.
+    """
+    issues = []
+
+    subject = res.get("subject")
+    reference = subject.get("reference") if isinstance(subject, dict) else None
+    if not isinstance(reference, str) or not reference:
+        issues.append(_issue("required", "Condition.subject.reference is required", f"{path}.subject.reference"))
+    elif not PATIENT_REFERENCE.match(reference):
+        issues.append(_issue("value", f"subject.reference must be Patient/<id> or urn:uuid:<uuid>, got {reference!r}",
+                             f"{path}.subject.reference"))
+
+    code = res.get("code")
+    codings = code.get("coding") if isinstance(code, dict) else None
+    if not isinstance(codings, list) or not codings:
+        issues.append(_issue("required", "Condition.code.coding is required", f"{path}.code.coding"))
+        codings = []
+
+    # the first NAMASTE and the first ICD-11 coding are stored; other code systems pass through
+    found = {"namaste": None, "icd": None}
+    for j, coding in enumerate(codings):
+        where = f"{path}.code.coding[{j}]"
+        if not isinstance(coding, dict):
+            issues.append(_issue("structure", "Coding must be an object", where))
+            continue
+        system = coding.get("system") or ""
+        kind = "namaste" if "ayush" in system else "icd" if "who.int" in system else None
+        if kind is None or found[kind] is not None:
+            continue
+        value = coding.get("code")
+        if not isinstance(value, str) or not value:
+            issues.append(_issue("required", "Coding.code is required", f"{where}.code"))
+        elif kind == "namaste" and snapshot.find_code(value) is None:
+            issues.append(_issue("code-invalid", f"Unknown NAMASTE code {value!r}", f"{where}.code"))
+        elif kind == "icd" and not _icd_known(graph, value):
+            issues.append(_issue("code-invalid", f"ICD-11 code {value!r} is not in the loaded release", f"{where}.code"))
+        else:
+            found[kind] = coding
+    if codings and not issues and found["namaste"] is None and found["icd"] is None:
+        issues.append(_issue("required", "At least one NAMASTE or ICD-11 coding is required", f"{path}.code.coding"))
+
+    if issues:
+        return None, issues
+    namaste, icd = found["namaste"] or {}, found["icd"] or {}
+    return {
+        "patient_id": reference.split("/")[-1],
+        "namaste_code": namaste.get("code"),
+        "namaste_display": namaste.get("display"),
+        "icd_code": icd.get("code"),
+        "icd_display": icd.get("display"),
+    }, []
+
+
+def validate_shard(entries: list[tuple[int, dict]], snapshot: NamasteSnapshot, graph: IcdGraph) -> tuple[list, list]:
+    """(entry index, resource) pairs -> ([(entry index, content hash, fields)], issues)"""
+    valid, issues = [], []
+    for index, res in entries:
+        fields, problems = check_condition(res, f"Bundle.entry[{index}].resource", snapshot, graph)
+        if problems:
+            issues.extend(problems)
+        else:
+            valid.append((index, content_hash(res), fields))
+    return valid, issues
+
+
+async def validate_conditions(entries: list[tuple[int, dict]], snapshot: NamasteSnapshot, graph: IcdGraph) -> tuple[list, list]:
+    """
+    Validate bundle entries in a worker thread, off the event loop. Each entry
+    costs a regex and a few index lookups, less than shipping it to another
+    process would, so bundles are not sharded across processes.
+    """
+    return await run_in_threadpool(validate_shard, entries, snapshot, graph)
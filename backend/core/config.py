@@ -12,6 +12,17 @@ class Settings(BaseSettings):
     DEBUG: bool = False
 
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str = ""  # derived from DATABASE_URL (aiosqlite / asyncpg) when empty
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a pooled connection is replaced
+
+    # SQLite tuning (ignored on PostgreSQL)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # wait this long for a lock instead of failing with "database is locked"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_SERIALIZED_WRITES: bool = True  # funnel all writes through one writer thread
     SECRET_KEY: str  # for JWT
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
@@ -22,9 +33,80 @@ class Settings(BaseSettings):
     WHO_CLIENT_ID: str = ""
     WHO_CLIENT_SECRET: str = ""
     WHO_API_BASE: str = "https://id.who.int/icd"
+    WHO_TOKEN_URL: str = "https://icdaccessmanagement.who.int/connect/token"
+    ICD_RELEASE_VERSION: str = "2025-01"  # MMS release used for search/entity lookups
+
+    # WHO upstream resilience
+    WHO_CONNECT_TIMEOUT: float = 3.0
+    WHO_READ_TIMEOUT: float = 10.0
+    WHO_MAX_RETRIES: int = 2
+    WHO_RETRY_BUDGET_RATIO: float = 0.1  # retries allowed per first attempt
+    WHO_BREAKER_FAILURES: int = 5  # consecutive failures before failing fast
+    WHO_BREAKER_RESET_SECONDS: float = 30.0
+    WHO_SEARCH_FRESH_SECONDS: int = 3600  # serve cached search results as-is
+    WHO_SEARCH_STALE_SECONDS: int = 86400  # serve stale results while refreshing in the background
+    WHO_MAX_CONCURRENCY: int = 8  # parallel entity fetches per resolution round
+
+    # Per-user token buckets, shared by the workers that share CACHE_BACKEND
+    RATE_LIMIT_WHO_PER_MINUTE: int = 120  # translate / search / entity
+    RATE_LIMIT_WHO_BURST: int = 30
+    RATE_LIMIT_AI_PER_MINUTE: int = 10  # create-namaste-job
+    RATE_LIMIT_AI_BURST: int = 5
+    # Upstream calls in flight per worker, and how many more may wait for a slot
+    WHO_MAX_IN_FLIGHT: int = 16
+    WHO_MAX_QUEUED: int = 64
+    WHO_QUEUE_TIMEOUT: float = 5.0
+    GEMINI_MAX_IN_FLIGHT: int = 4
+    GEMINI_MAX_QUEUED: int = 16  # waiting AI jobs hold threadpool threads, keep this well under its size
+
+    # NAMASTE terminology; compiled on first use into a snapshot every worker memory-maps
+    NAMASTE_CSV_PATH: str = str(BASE_DIR / "data" / "namaste.csv")
+    NAMASTE_SNAPSHOT_PATH: str = str(BASE_DIR / "cache" / "namaste.snap")
+
+    # Local MMS hierarchy (WHO simple tabulation, or `python -m core.icd_graph` output)
+    ICD_SNAPSHOT_PATH: str = str(BASE_DIR / "data" / "icd11_mms_tabulation.txt")
+
+    # Cache for WHO tokens, search results, the ICD hierarchy and AI results.
+    # memory: per worker; sqlite: shared by workers on one host; redis: shared across hosts
+    CACHE_BACKEND: str = "memory"
+    CACHE_SQLITE_PATH: str = str(BASE_DIR / "cache" / "cache.db")
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    AI_CACHE_TTL_SECONDS: int = 7 * 86400
+
+    # WebSocket autocomplete: wait this long after a keystroke so only the latest query is answered
+    AUTOCOMPLETE_WS_DEBOUNCE_MS: int = 30
+    AUTOCOMPLETE_WS_AUTH_TIMEOUT: float = 10.0  # seconds to send the token after connecting
+
+    # HTTP caching of terminology responses (ETags change with the NAMASTE data / ICD release)
+    HTTP_CACHE_MAX_AGE: int = 3600  # browsers reuse without asking; shared caches always revalidate
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent as-is
 
     ALLOWED_ORIGINS: str = ""
 
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json | text
+
+    # Request profiling: slow requests are kept (per worker) with per-stage timings for /admin/slow-requests
+    ADMIN_USERNAMES: str = ""  # comma-separated; may call admin endpoints and send `X-Profile: 1`
+    SLOW_REQUEST_THRESHOLD_MS: int = 1000
+    SLOW_REQUEST_BUFFER: int = 200  # most recent captures kept
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests run under the sampling profiler
+    PROFILE_INTERVAL_MS: float = 5.0  # stack sampling interval
+
+    # Tracing: spans (requests, DB queries, WHO and Gemini calls, AI jobs) appended as JSON lines; empty disables
+    TRACE_EXPORT_PATH: str = ""
+
+    # AI job retention: finished jobs older than this are deleted (archived first if JOB_ARCHIVE_DIR is set)
+    JOB_RETENTION_DAYS: int = 30  # 0 disables the reaper
+    JOB_REAP_INTERVAL_SECONDS: int = 3600
+    JOB_REAP_BATCH_SIZE: int = 1000  # rows per delete transaction
+    JOB_ARCHIVE_DIR: str = ""  # gzip NDJSON, one file per day
+
+    # FHIR Bulk Data $export
+    EXPORT_DIR: str = str(BASE_DIR / "exports")
+    EXPORT_MAX_FILE_BYTES: int = 64 * 1024 * 1024  # start a new NDJSON file past this size
+    EXPORT_FETCH_SIZE: int = 1000  # rows per server-side cursor fetch
+
     class Config:
         env_file = str(env_path)
         env_file_encoding = "utf-8"
@@ -0,0 +1,55 @@
+import uuid
+
+# ================= CODE SYSTEMS =================
+NAMASTE_SYSTEM = "http://ayush.gov.in/namaste"
+ICD11_MMS_SYSTEM = "http://id.who.int/icd/release/11/mms"
+
+# ================= STATIC CONDITION FRAGMENTS =================
+# Built once at import and shared by every generated Condition.
+# Treat them as read-only: they are referenced, not copied.
+CLINICAL_STATUS_ACTIVE = {
+    "coding": [{"system": "http://terminology.hl7.org/CodeSystem/condition-clinical", "code": "active", "display": "Active"}]
+}
+VERIFICATION_STATUS_CONFIRMED = {
+    "coding": [{"system": "http://terminology.hl7.org/CodeSystem/condition-ver-status", "code": "confirmed", "display": "Confirmed"}]
+}
+_TRANSACTION_REQUEST = {"method": "POST", "url": "Condition"}
+NAMASTE_SYSTEM_EXTENSION = "http://ayush.gov.in/fhir/StructureDefinition/namaste-system"
+
+
+def build_condition(patient_id: str, namaste_code=None, namaste_display=None, icd_code=None, icd_display=None,
+                    namaste_system=None) -> dict:
+    """Fill the Condition template; only the coding and subject parts are built per call"""
+    namaste_coding = {"system": NAMASTE_SYSTEM, "code": namaste_code, "display": namaste_display}
+    if namaste_system:
+        # Ayurveda / Siddha / Unani
+        namaste_coding["extension"] = [{"url": NAMASTE_SYSTEM_EXTENSION, "valueString": namaste_system}]
+    return {
+        "resourceType": "Condition",
+        "clinicalStatus": CLINICAL_STATUS_ACTIVE,
+        "verificationStatus": VERIFICATION_STATUS_CONFIRMED,
+        "code": {
+            "text": f"{namaste_display or ''} / {icd_display or ''}",
+            "coding": [
+                namaste_coding,
+                {"system": ICD11_MMS_SYSTEM, "code": icd_code, "display": icd_display}
+            ]
+        },
+        "subject": {"reference": f"Patient/{patient_id}", "display": f"Patient {patient_id}"}
+    }
+
+
+def build_operation_outcome(issues: list[dict]) -> dict:
+    return {"resourceType": "OperationOutcome", "issue": issues}
+
+
+def build_transaction_bundle(resources: list[dict]) -> dict:
+    """Wrap Conditions in a FHIR transaction Bundle, one POST entry per resource"""
+    return {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": [
+            {"fullUrl": f"urn:uuid:{uuid.uuid4()}", "resource": res, "request": _TRANSACTION_REQUEST}
+            for res in resources
+        ]
+    }
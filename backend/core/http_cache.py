@@ -0,0 +1,61 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from core.config import settings
+
+# content-codings the compression middleware appends to an ETag ("abc" -> "abc-gzip")
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def make_etag(version: str, *key) -> str:
+    """Strong ETag for a response that is fully determined by a data version plus the query"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in (version, *key)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)]
+    return tag
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    The If-None-Match entry naming `etag` (weak comparison), or None. A tag from
+    a compressed copy still names the same data; it is returned as sent so a 304
+    repeats the validator the client actually holds.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        if _opaque(tag) == _opaque(etag):
+            return tag.strip()
+    return None
+
+
+def conditional(request: Request, response: Response, version: str, *key) -> Optional[Response]:
+    """
+    Put ETag / Cache-Control on `response` and return a 304 when the client
+    already holds this representation. Shared caches get s-maxage=0, so every
+    reuse through a proxy is revalidated here (auth and rate limits still apply)
+    and costs a 304 rather than the full body.
+    """
+    headers = {
+        "ETag": make_etag(version, *key),
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, s-maxage=0",
+        "Vary": "Accept-Encoding",
+    }
+    held = matching_etag(request.headers.get("if-none-match"), headers["ETag"])
+    if held:
+        return Response(status_code=304, headers={**headers, "ETag": held})
+    response.headers.update(headers)
+    return None
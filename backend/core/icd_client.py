@@ -1,29 +1,31 @@
-import requests
+import contextvars
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from core.config import settings
-from typing import Optional, Dict, Any, List
+from core.cache import make_cache
+from core.utils import who_request, who_search_cache, get_who_token as _cached_who_token
+from typing import Optional, Dict, Any, List, Iterable
 import re
 
+import requests
+
+from core.resilience import UpstreamUnavailable, RateLimited
+
 
-TOKEN_ENDPOINT = "https://icdaccessmanagement.who.int/connect/token"
-ICD_API_BASE = "https://id.who.int/icd"  # Base URL for all API calls
+TOKEN_ENDPOINT = settings.WHO_TOKEN_URL
+ICD_API_BASE = settings.WHO_API_BASE  # Base URL for all API calls
 ICD_RELEASE = "11"  # ICD-11 release
 
 
 def get_who_token():
-    """Get authentication token from WHO API"""
-    payload = {
-        "client_id": settings.WHO_CLIENT_ID,
-        "client_secret": settings.WHO_CLIENT_SECRET,
-        "scope": "icdapi_access",
-        "grant_type": "client_credentials"
-    }
-    r = requests.post(TOKEN_ENDPOINT, data=payload, verify=True)
-    r.raise_for_status()
-    return r.json().get("access_token")
+    """Get authentication token from WHO API (cached until expiry)"""
+    return _cached_who_token()
+
 
+logger = logging.getLogger(__name__)
 
-logging.basicConfig(level=logging.INFO)
+_STEM_CODE_RE = re.compile(r'^[A-Z0-9]{1,2}\d{2,}(\.\d+)?$')
+_TITLE_CODE_RE = re.compile(r'\(([A-Z0-9]{2,}\.[0-9]+)\)')
 
 
 def _is_valid_icd11_stem_code(code: str) -> bool:
@@ -34,8 +36,17 @@ def _is_valid_icd11_stem_code(code: str) -> bool:
     """
     if not code:
         return False
-    pattern = r'^[A-Z0-9]{1,2}\d{2,}(\.\d+)?$'
-    return re.match(pattern, code) is not None
+    return _STEM_CODE_RE.match(code) is not None
+
+
+def _related_code(related) -> Optional[str]:
+    """Code of a child/parent given inline ({'code': ...}) or as a URI already in the hierarchy cache"""
+    if isinstance(related, dict):
+        return related.get('code')
+    if isinstance(related, str):
+        node = hierarchy.get(entity_id_from_uri(related))
+        return node["code"] if node else None
+    return None
 
 
 def extract_icd11_code(entity_data: Dict[str, Any]) -> Optional[str]:
@@ -47,53 +58,43 @@ def extract_icd11_code(entity_data: Dict[str, Any]) -> Optional[str]:
     if entity_code and _is_valid_icd11_stem_code(entity_code):
         return entity_code
 
-    # Priority 2: Check children
-    children = entity_data.get('children', [])
+    # Priority 2: Check children (WHO responses list them under 'child' as URIs)
+    children = entity_data.get('children') or entity_data.get('child') or []
     for child in children:
-        child_code = child.get('code')
+        child_code = _related_code(child)
         if child_code and _is_valid_icd11_stem_code(child_code):
             return child_code
 
     # Priority 3: Check parent
     parents = entity_data.get('parent', [])
-    if isinstance(parents, list):
-        for parent in parents:
-            parent_code = parent.get('code')
-            if parent_code and _is_valid_icd11_stem_code(parent_code):
-                return parent_code
-    elif isinstance(parents, dict):
-        parent_code = parents.get('code')
+    if not isinstance(parents, list):
+        parents = [parents]
+    for parent in parents:
+        parent_code = _related_code(parent)
         if parent_code and _is_valid_icd11_stem_code(parent_code):
             return parent_code
 
     # Priority 4: Extract from title
-    title = entity_data.get('title', {}).get('@value', '')
-    code_in_title = re.search(r'\(([A-Z0-9]{2,}\.[0-9]+)\)', title)
+    title = entity_data.get('title', {})
+    title = title.get('@value', '') if isinstance(title, dict) else (title or '')
+    code_in_title = _TITLE_CODE_RE.search(title)
     if code_in_title:
         potential_code = code_in_title.group(1)
         if _is_valid_icd11_stem_code(potential_code):
             return potential_code
 
-    logging.warning(f"⚠️ Could not extract stem code from: {entity_data.get('title', {}).get('@value', 'No Title')}")
+    logger.debug("Could not extract stem code from: %s", title or 'No Title')
     return None
 
 
 def fetch_entity(entity_id: str) -> Dict[str, Any]:
     """Fetch a specific entity from the WHO ICD-11 API"""
-    token = get_who_token()
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "API-Version": "v2",
-        "Accept-Language": "en"
-    }
+    headers = get_headers()
 
     # CORRECTED ENDPOINT
     url = f"{ICD_API_BASE}/release/{ICD_RELEASE}/{entity_id}"
-    logging.info(f"🌐 Fetching entity: {url}")
 
-    r = requests.get(url, headers=headers, verify=True)
-    logging.info(f"📥 Response Status: {r.status_code}")
+    r = who_request("entity", "GET", url, headers=headers, verify=True)
     r.raise_for_status()
 
     entity_data = r.json()
@@ -170,16 +171,7 @@ def test_icd_api():
 
 def get_token():
     """Fetch WHO ICD API OAuth2 token"""
-    token_endpoint = 'https://icdaccessmanagement.who.int/connect/token'
-    payload = {
-        'client_id': settings.WHO_CLIENT_ID,
-        'client_secret': settings.WHO_CLIENT_SECRET,
-        'scope': 'icdapi_access',
-        'grant_type': 'client_credentials'
-    }
-
-    token_response = requests.post(token_endpoint, data=payload, verify=False).json()
-    token = token_response.get('access_token')
+    token = get_who_token()
     if not token:
         raise Exception("Failed to get access token from WHO ICD API")
     return token
@@ -196,31 +188,161 @@ def get_headers():
     }
 
 
-def search_icd(diagnosis_name: str):
-    """Search ICD-11 by disease name"""
+def _search_icd_uncached(search_url: str):
     headers = get_headers()
-    search_url = f"https://id.who.int/icd/release/11/2025-01/mms/search?q={diagnosis_name}"
-    response = requests.get(search_url, headers=headers, verify=False)
+    response = who_request("search", "GET", search_url, headers=headers, verify=False)
+    response.raise_for_status()
     return response.json()
 
 
+def search_icd(diagnosis_name: str):
+    """Search ICD-11 by disease name (stale-while-revalidate cached)"""
+    search_url = f"{ICD_API_BASE}/release/{ICD_RELEASE}/{settings.ICD_RELEASE_VERSION}/mms/search?q={diagnosis_name}"
+    return who_search_cache.get_or_load(search_url, lambda: _search_icd_uncached(search_url))
+
+
 def get_icd_entity(entity_id: str):
     """
     Get ICD-11 entity details from WHO (e.g., 2020851679).
     Returns dict: { 'name': str, 'code': str, 'id': str }
+    Raises LookupError when WHO does not know the entity; other upstream
+    failures propagate (requests errors, UpstreamUnavailable, RateLimited).
     """
-    headers = get_headers()
-    entity_url = f"http://id.who.int/icd/release/11/2025-01/mms/{entity_id}"
-    r = requests.get(entity_url, headers=headers, verify=False)
-    entity_data = r.json()
+    node = hierarchy.get(entity_id)
+    if node is None:
+        try:
+            node = _fetch_node(entity_id, get_headers())
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                raise LookupError(f"ICD-11 entity {entity_id} not found") from e
+            raise
+        hierarchy.put(node)
+
+    return {
+        "id": entity_id,
+        "name": node["title"],
+        "code": node["code"]
+    }
+
+
+# ================= HIERARCHY CACHE + BATCHED RESOLUTION =================
+def entity_id_from_uri(uri: str) -> str:
+    return uri.rstrip("/").split("/")[-1] if uri else ""
+
+
+class IcdHierarchy:
+    """
+    Cache of the MMS graph: entity id -> node
+    {"id", "code", "title", "parents": [ids], "children": [ids]}.
+    Entities only change with a release, so nodes never expire and keys carry the
+    release version; on the in-process backend the LRU bound caps memory.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self._cache = make_cache("icd_hierarchy", max_entries)
+        self._release = settings.ICD_RELEASE_VERSION
+
+    def get_many(self, entity_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = self._cache.get_many(f"{self._release}:{i}" for i in entity_ids)
+        return {node["id"]: node for node in found.values()}
+
+    def get(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([entity_id]).get(entity_id)
+
+    def put_many(self, nodes: Iterable[Dict[str, Any]]):
+        self._cache.set_many({f"{self._release}:{n['id']}": n for n in nodes})
+
+    def put(self, node: Dict[str, Any]):
+        self.put_many([node])
+
 
+hierarchy = IcdHierarchy()
+_resolver_pool = ThreadPoolExecutor(max_workers=settings.WHO_MAX_CONCURRENCY, thread_name_prefix="icd-resolve")
+
+
+def _node_from_entity(entity_id: str, entity_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The entity's code is kept as WHO sends it (chapter and extension codes included); callers filter for stems"""
+    title = entity_data.get("title", {})
     return {
         "id": entity_id,
-        "name": entity_data["title"]["@value"],
-        "code": entity_data["code"]
+        "code": entity_data.get("code"),
+        "title": title.get("@value") if isinstance(title, dict) else title,
+        "parents": [entity_id_from_uri(u) for u in entity_data.get("parent", []) if isinstance(u, str)],
+        "children": [entity_id_from_uri(u) for u in entity_data.get("child", []) if isinstance(u, str)],
     }
 
 
+def node_stem_code(node: Dict[str, Any]) -> Optional[str]:
+    """The node's code when it is a stem code, None for chapters, blocks and extension codes"""
+    return node["code"] if _is_valid_icd11_stem_code(node["code"]) else None
+
+
+def _fetch_node(entity_id: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    url = f"{ICD_API_BASE}/release/{ICD_RELEASE}/{settings.ICD_RELEASE_VERSION}/mms/{entity_id}"
+    r = who_request("entity", "GET", url, headers=headers, verify=True)
+    r.raise_for_status()
+    return _node_from_entity(entity_id, r.json())
+
+
+def resolve_entities(entity_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Nodes for the given MMS entity ids. Cached nodes are returned directly; the rest
+    are fetched concurrently in one round with a single token. Failed fetches are left out,
+    except that an open circuit or a full upstream queue is raised once the round is done,
+    so callers answer 503/429 instead of treating the entities as unknown.
+    """
+    wanted = list(dict.fromkeys(i for i in entity_ids if i))
+    result = hierarchy.get_many(wanted)
+    missing = [i for i in wanted if i not in result]
+
+    if missing:
+        headers = get_headers()
+        # each fetch runs in the caller's context so its WHO call lands in the caller's trace
+        futures = {entity_id: _resolver_pool.submit(contextvars.copy_context().run, _fetch_node, entity_id, headers)
+                   for entity_id in missing}
+        overloaded = None
+        for entity_id, future in futures.items():
+            try:
+                node = future.result()
+            except (UpstreamUnavailable, RateLimited) as e:
+                overloaded = overloaded or e
+                continue
+            except Exception as e:
+                logger.debug("Entity fetch failed", extra={"entity_id": entity_id, "error": str(e)})
+                continue
+            result[entity_id] = node
+        hierarchy.put_many(result[i] for i in missing if i in result)
+        if overloaded is not None:
+            raise overloaded
+    return result
+
+
+def resolve_stem_codes(entities: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """
+    Stem codes for a page of search results, in order. Codes present inline are used as-is;
+    the remaining entities are fetched in one parallel round, and only entities that still
+    lack a code trigger a second round for their children and parents.
+    """
+    ids = [entity_id_from_uri(e.get("id") or e.get("@id") or "") for e in entities]
+    codes = {}
+    for entity_id, entity in zip(ids, entities):
+        code = entity.get("theCode") if _is_valid_icd11_stem_code(entity.get("theCode")) else extract_icd11_code(entity)
+        if code:
+            codes[entity_id] = code
+
+    nodes = resolve_entities(i for i in ids if i not in codes)
+    uncoded = [n for n in nodes.values() if not node_stem_code(n)]
+    relatives = resolve_entities(r for n in uncoded for r in n["children"] + n["parents"])
+    for node in nodes.values():
+        code = node_stem_code(node) or next(
+            (c for c in (node_stem_code(relatives[r]) for r in node["children"] + node["parents"] if r in relatives) if c),
+            None,
+        )
+        if code:
+            codes[node["id"]] = code
+
+    return [codes.get(entity_id) for entity_id in ids]
+
 
 if __name__ == "__main__":
     test_icd_api()
\ No newline at end of file
@@ -0,0 +1,195 @@
+import csv
+import logging
+import os
+import re
+from array import array
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+# postcoordinated ICD-11 codes: stems joined by '&' (extension codes) or '/' (clusters)
+ICD_STEM_SEPARATORS = re.compile(r"[&/]")
+
+
+def stem_code(code: Optional[str]) -> Optional[str]:
+    """The leading stem of a (possibly postcoordinated) code: '1A00&XN5PF' -> '1A00'"""
+    return ICD_STEM_SEPARATORS.split(code, 1)[0] if code else code
+
+
+class IcdGraph:
+    """
+    Array-backed ICD-11 MMS linearization.
+
+    Nodes are stored in DFS preorder, so the subtree of node i is the contiguous
+    index range [i, end[i]] (Euler-tour / interval encoding). That makes
+    is-a a two-comparison check and descendants a slice; ancestors follow
+    parent links, which are at most a handful deep in MMS.
+    """
+
+    def __init__(self):
+        self.codes = []  # stem code, BlockId for blocks, chapter number for chapters
+        self.titles = []
+        self.kinds = []  # chapter / block / category
+        self.entity_ids = []
+        self.parent = array("i")
+        self.end = array("i")
+        self.index = {}  # code / block id / chapter / entity id -> node index
+
+    def __len__(self):
+        return len(self.codes)
+
+    # ================= LOADING =================
+    @classmethod
+    def from_tabulation(cls, path: str) -> "IcdGraph":
+        """
+        Load WHO's MMS simple tabulation (LinearizationMiniOutput-MMS-en.txt,
+        tab-separated). Rows are in preorder and the tree depth is the number of
+        leading '- ' markers on the title.
+        """
+        graph = cls()
+        stack = []  # indexes of open ancestors, deepest last
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                raw_title = row.get("Title") or ""
+                depth = 0
+                while raw_title.startswith("- ", depth * 2):
+                    depth += 1
+                title = raw_title[depth * 2:].strip()
+
+                kind = (row.get("ClassKind") or "").strip()
+                code = (row.get("Code") or "").strip() or (row.get("BlockId") or "").strip()
+                if kind == "chapter":
+                    code = (row.get("ChapterNo") or "").strip() or code
+                uri = (row.get("Linearization (release) URI") or row.get("Linearization URI") or "").strip()
+
+                i = len(graph.codes)
+                del stack[depth:]
+                graph.codes.append(code)
+                graph.titles.append(title)
+                graph.kinds.append(kind)
+                graph.entity_ids.append(uri.rstrip("/").split("/")[-1] if uri else "")
+                graph.parent.append(stack[-1] if stack else -1)
+                graph.end.append(i)
+                stack.append(i)
+
+        # close intervals: each node's subtree ends where its last descendant is
+        for i in range(len(graph.codes) - 1, -1, -1):
+            p = graph.parent[i]
+            if p >= 0 and graph.end[i] > graph.end[p]:
+                graph.end[p] = graph.end[i]
+
+        for i, (code, entity_id) in enumerate(zip(graph.codes, graph.entity_ids)):
+            if code:
+                graph.index.setdefault(code, i)
+            if entity_id:
+                graph.index.setdefault(entity_id, i)
+        return graph
+
+    @classmethod
+    def load(cls, path: str) -> "IcdGraph":
+        if not path or not os.path.exists(path):
+            logger.warning("ICD-11 snapshot not found, hierarchy queries disabled", extra={"path": path})
+            return cls()
+        graph = cls.from_tabulation(path)
+        logger.info("Loaded ICD-11 hierarchy snapshot", extra={"nodes": len(graph), "path": path})
+        return graph
+
+    # ================= QUERIES =================
+    def find(self, key: str) -> Optional[int]:
+        return self.index.get(key)
+
+    def node(self, i: int) -> dict:
+        return {"code": self.codes[i], "title": self.titles[i], "kind": self.kinds[i], "entity_id": self.entity_ids[i]}
+
+    def is_a(self, i: int, ancestor: int) -> bool:
+        return ancestor <= i <= self.end[ancestor]
+
+    def ancestors(self, i: int) -> list[int]:
+        """Nearest first, up to the chapter"""
+        result = []
+        p = self.parent[i]
+        while p >= 0:
+            result.append(p)
+            p = self.parent[p]
+        return result
+
+    def descendants(self, i: int) -> range:
+        return range(i + 1, self.end[i] + 1)
+
+    def subtree_codes(self, i: int) -> list[str]:
+        """Stem codes of the node and everything below it (categories only, not blocks/chapters)"""
+        return [self.codes[j] for j in range(i, self.end[i] + 1) if self.kinds[j] == "category" and self.codes[j]]
+
+
+# ================= REQUEST HELPERS =================
+def get_graph(request: Request) -> IcdGraph:
+    graph = request.app.state.icd_graph
+    if not len(graph):
+        raise HTTPException(status_code=503, detail="ICD-11 hierarchy snapshot is not loaded")
+    return graph
+
+
+def find_node(graph: IcdGraph, code: str) -> int:
+    i = graph.find(code)
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"ICD-11 code {code} not found in the loaded release")
+    return i
+
+
+# ================= SNAPSHOT BUILDER =================
+TABULATION_COLUMNS = ["Linearization (release) URI", "Code", "BlockId", "Title", "ClassKind", "ChapterNo"]
+
+
+def build_snapshot(path: str) -> int:
+    """
+    Crawl the MMS linearization from the WHO API, one parallel round per level,
+    and write it in the simple-tabulation layout `from_tabulation` reads.
+    Prefer WHO's published tabulation file when it is available; this is for
+    releases or environments where only API access exists. Returns the node count.
+    """
+    from core.config import settings
+    from core.icd_client import ICD_API_BASE, ICD_RELEASE, get_headers, resolve_entities, entity_id_from_uri, node_stem_code
+    from core.utils import who_request
+
+    release_url = f"{ICD_API_BASE}/release/{ICD_RELEASE}/{settings.ICD_RELEASE_VERSION}/mms"
+    r = who_request("entity", "GET", release_url, headers=get_headers(), verify=True)
+    r.raise_for_status()
+    chapters = [entity_id_from_uri(u) for u in r.json().get("child", []) if isinstance(u, str)]
+
+    nodes, level = {}, chapters
+    while level:
+        fetched = resolve_entities(i for i in level if i not in nodes)
+        nodes.update(fetched)
+        level = [c for n in fetched.values() for c in n["children"] if c not in nodes]
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(TABULATION_COLUMNS)
+        seen = set()
+        stack = [(c, 0) for c in reversed(chapters)]
+        while stack:
+            entity_id, depth = stack.pop()
+            node = nodes.get(entity_id)
+            if node is None or entity_id in seen:
+                continue
+            seen.add(entity_id)
+            code = node_stem_code(node)
+            kind = "chapter" if depth == 0 else ("category" if code else "block")
+            writer.writerow([
+                f"{release_url}/{entity_id}", code or "", "" if code else entity_id,
+                "- " * depth + (node["title"] or ""), kind, (node["code"] or "") if depth == 0 else "",
+            ])
+            count += 1
+            stack.extend((c, depth + 1) for c in reversed(node["children"]))
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    from core.config import settings
+
+    target = sys.argv[1] if len(sys.argv) > 1 else settings.ICD_SNAPSHOT_PATH
+    print(f"Wrote {build_snapshot(target)} nodes to {target}")
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from core.analytics import record_code_usage
+from core.icd_graph import stem_code
+from models import audit_logging
+from models.model import uuid4_str
+
+# hashes per IN (...) existence check
+HASH_BATCH_SIZE = 500
+
+
+def _condition_from_resource(res: dict, fields: dict, digest: str, actor: str | None) -> audit_logging.Condition:
+    return audit_logging.Condition(
+        id = uuid4_str(),
+        **fields,
+        icd_stem = stem_code(fields.get("icd_code")),
+        source = "bundle-upload",
+        created_by = actor,
+        created_at = datetime.utcnow(),
+        raw_fhir = res,
+        content_hash = digest,
+    )
+
+
+def existing_hashes(db: Session, digests) -> set:
+    """One set-based lookup per HASH_BATCH_SIZE hashes instead of a query per resource"""
+    digests = list(digests)
+    found = set()
+    for i in range(0, len(digests), HASH_BATCH_SIZE):
+        rows = db.query(audit_logging.Condition.content_hash).filter(
+            audit_logging.Condition.content_hash.in_(digests[i:i + HASH_BATCH_SIZE])
+        )
+        found.update(h for (h,) in rows)
+    return found
+
+
+def store_conditions(db: Session, entries: list[tuple[str, dict, dict]], actor: str | None) -> tuple[list, int]:
+    """
+    Insert validated Conditions, given as (content hash, resource, extracted
+    fields) from core.condition_validation, that are not stored yet, with their
+    audit rows, in a single transaction. Returns (stored Conditions, number of
+    duplicates skipped). The caller commits.
+    """
+    # dedup inside the bundle first, then against the table
+    by_hash = {}
+    for digest, res, fields in entries:
+        by_hash.setdefault(digest, (res, fields))
+    already = existing_hashes(db, by_hash)
+
+    new_conditions = [
+        _condition_from_resource(res, fields, digest, actor)
+        for digest, (res, fields) in by_hash.items() if digest not in already
+    ]
+    db.add_all(new_conditions)
+    db.add_all([
+        audit_logging.AuditLog(actor=actor, action="bundle-condition-store", resource=c.id, details={"patient": c.patient_id})
+        for c in new_conditions
+    ])
+    # keep the code-usage aggregates current without re-scanning conditions
+    record_code_usage(db, new_conditions)
+
+    return new_conditions, len(entries) - len(new_conditions)
+
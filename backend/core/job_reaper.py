@@ -0,0 +1,82 @@
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.writer import write_queue
+from models.job import NamasteJob
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+ARCHIVED_COLUMNS = ("job_id", "status", "result", "prompt", "error", "traceparent", "created_at", "completed_at")
+
+
+def _archive(rows: list[dict]):
+    """
+    Append to today's gzip NDJSON file and fsync it; each run adds one gzip
+    member, which readers concatenate. The member is compressed up front and
+    written in one call, so a failed run leaves no half-written member behind.
+    """
+    os.makedirs(settings.JOB_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_ARCHIVE_DIR, f"jobs-{datetime.utcnow():%Y%m%d}.ndjson.gz")
+    member = gzip.compress(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+    with open(path, "ab") as f:
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def reap_jobs(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete up to `batch_size` finished jobs created before `cutoff`. Runs on the
+    writer: with JOB_ARCHIVE_DIR set the deleted rows are archived (and synced to
+    disk) before the writer commits, and an archive failure rolls the delete
+    back, so no job is purged without a copy. The price is that a commit
+    failing after the archive write leaves those jobs archived twice.
+    DELETE ... RETURNING hands each row to exactly one worker.
+    """
+    oldest = (
+        select(NamasteJob.id)
+        .where(NamasteJob.status.in_(FINISHED_STATUSES), NamasteJob.created_at < cutoff)
+        .order_by(NamasteJob.created_at)
+        .limit(batch_size)
+    )
+    stmt = (
+        delete(NamasteJob)
+        .where(NamasteJob.id.in_(oldest))
+        .returning(*(getattr(NamasteJob, c) for c in ARCHIVED_COLUMNS))
+        .execution_options(synchronize_session=False)
+    )
+    rows = [dict(row._mapping) for row in db.execute(stmt)]
+    if rows and settings.JOB_ARCHIVE_DIR:
+        _archive(rows)
+    return len(rows)
+
+
+async def reap_finished_jobs(cutoff: datetime) -> int:
+    """Purge finished jobs created before `cutoff`, one JOB_REAP_BATCH_SIZE transaction at a time"""
+    total = 0
+    while True:
+        removed = await write_queue.run_async(reap_jobs, cutoff, settings.JOB_REAP_BATCH_SIZE)
+        total += removed
+        if removed < settings.JOB_REAP_BATCH_SIZE:
+            return total
+
+
+async def run_job_reaper():
+    """Lifespan task: every JOB_REAP_INTERVAL_SECONDS, purge finished jobs older than JOB_RETENTION_DAYS"""
+    while True:
+        try:
+            total = await reap_finished_jobs(datetime.utcnow() - timedelta(days=settings.JOB_RETENTION_DAYS))
+            if total:
+                logger.info("Reaped finished jobs", extra={"removed": total, "archived": bool(settings.JOB_ARCHIVE_DIR)})
+        except Exception as e:
+            logger.warning("Job reaper run failed", extra={"error": str(e)})
+        await asyncio.sleep(settings.JOB_REAP_INTERVAL_SECONDS)
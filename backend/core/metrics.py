@@ -0,0 +1,119 @@
+import os
+from time import perf_counter
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import func
+
+# ================= METRICS =================
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ["method", "route", "status"],
+)
+WHO_REQUEST_DURATION = Histogram(
+    "who_upstream_request_duration_seconds", "WHO ICD API call latency",
+    ["endpoint"],
+)
+WHO_RESPONSES = Counter(
+    "who_upstream_responses_total", "WHO ICD API responses by HTTP status ('error' for transport failures)",
+    ["endpoint", "status"],
+)
+WHO_RETRIES = Counter(
+    "who_upstream_retries_total", "WHO ICD API retry attempts",
+    ["endpoint"],
+)
+GEMINI_CALL_DURATION = Histogram(
+    "gemini_call_duration_seconds", "Gemini generate_content latency",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+GEMINI_TOKENS = Histogram(
+    "gemini_tokens", "Gemini token usage per call",
+    ["kind"],  # prompt / completion
+    buckets=(64, 256, 1024, 2048, 4096, 8192, 16384, 32768),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache name and result (hit / miss)",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# ================= SCRAPE-TIME STATE =================
+class _StateCollector:
+    """Job queue depth and DB pool gauges, read when /metrics is scraped"""
+
+    def describe(self):
+        # keeps register() from running collect() (and a DB query) at import time
+        return []
+
+    def collect(self):
+        from db.database import SessionLocal, engine
+        from models.job import NamasteJob
+
+        jobs = GaugeMetricFamily("namaste_jobs", "AI jobs by status", labels=["status"])
+        db = SessionLocal()
+        try:
+            for status, count in db.query(NamasteJob.status, func.count(NamasteJob.id)).group_by(NamasteJob.status):
+                jobs.add_metric([status or "unknown"], count)
+        finally:
+            db.close()
+        yield jobs
+
+        pool = engine.pool
+        for name, attr in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow"), ("checked_in", "checkedin")):
+            fn = getattr(pool, attr, None)
+            if fn is not None:
+                yield GaugeMetricFamily(f"db_pool_{name}", f"SQLAlchemy pool {name.replace('_', ' ')} connections", value=fn())
+
+
+def _build_registry():
+    # gunicorn/uvicorn workers share counters through PROMETHEUS_MULTIPROC_DIR when it is set
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    registry.register(_StateCollector())
+    return registry
+
+
+_registry = _build_registry()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(_registry), CONTENT_TYPE_LATEST
+
+
+# ================= MIDDLEWARE =================
+class MetricsMiddleware:
+    """ASGI middleware timing each request; labels use the route template, not the raw path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route.path if route else "unmatched", str(status)
+            ).observe(perf_counter() - start)
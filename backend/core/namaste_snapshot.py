@@ -0,0 +1,248 @@
+import csv
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("NAMASTE_Code", "Traditional_Term", "Biomedical_Term", "System")
+# hidden fields: normalized Traditional_Term / Biomedical_Term, the keys of the term indexes
+TERM_KEY = len(COLUMNS)
+BIOMEDICAL_KEY = len(COLUMNS) + 1
+FIELDS = len(COLUMNS) + 2
+
+# ================= FORMAT =================
+# header | string pool | fields | code index | term index | biomedical index | search blob | search starts
+#
+# fields:           (offset, length) u32 pairs into the pool, FIELDS per row
+# code index:       row ids sorted by NAMASTE_Code (binary search); duplicate codes last-in-file first,
+#                   so a lookup returns the last row, like the dict the index replaced
+# term index:       row ids sorted by normalized traditional term (binary search); duplicate terms
+#                   last-in-file first, like the code index (the diagnosis map it replaced kept the last row)
+# biomedical index: row ids sorted by normalized biomedical term; equal terms are adjacent
+# search blob:   per row "traditional\0biomedical\0system\n", lowercased, for substring scans
+# search starts: u32 offset of each row in the blob, plus the end offset
+#
+# Integers are native-endian; the byte-order mark makes a snapshot copied to a
+# host of the other endianness look stale, so it is recompiled there.
+MAGIC = b"NMSTSNAP"
+FORMAT_VERSION = 4
+BYTE_ORDER_MARK = 0x01020304
+HEADER = struct.Struct("=8sII16sIIQQQQQQQQQ")
+
+
+def source_digest(csv_path: str) -> str:
+    with open(csv_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _u32(values) -> bytes:
+    return array("I", values).tobytes()
+
+
+def build(rows: list[dict], digest: str) -> bytes:
+    """Serialize NAMASTE rows (CSV dicts) into the snapshot layout"""
+    records = []
+    for row in rows:
+        values = [(row.get(col) or "").strip() for col in COLUMNS]
+        records.append(values + [values[1].lower(), values[2].lower()])
+
+    pool, interned, fields = bytearray(), {}, []
+    for values in records:
+        for value in values:
+            raw = value.encode("utf-8")
+            if raw not in interned:
+                interned[raw] = len(pool)
+                pool += raw
+            fields += (interned[raw], len(raw))
+
+    # rows without a code are listed (and searchable) but not indexed, as before
+    keyed = [i for i, values in enumerate(records) if values[0]]
+    code_index = sorted(keyed, key=lambda i: (records[i][0].encode("utf-8"), -i))
+    term_index = sorted(keyed, key=lambda i: (records[i][TERM_KEY].encode("utf-8"), -i))
+    biomedical_index = sorted(keyed, key=lambda i: records[i][BIOMEDICAL_KEY].encode("utf-8"))
+
+    blob, starts = bytearray(), []
+    for values in records:
+        starts.append(len(blob))
+        blob += ("\0".join(v.lower() for v in values[1:4]) + "\n").encode("utf-8")
+    starts.append(len(blob))
+
+    sections = [
+        bytes(pool), _u32(fields), _u32(code_index), _u32(term_index), _u32(biomedical_index), bytes(blob), _u32(starts),
+    ]
+    offsets, position = [], HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, digest.encode("ascii"), len(rows), len(code_index),
+        offsets[0], len(pool), offsets[1], offsets[2], offsets[3], offsets[4], offsets[5], len(blob), offsets[6],
+    )
+    return header + b"".join(sections)
+
+
+def compile_snapshot(csv_path: str, snapshot_path: str) -> int:
+    """Compile namaste.csv into `snapshot_path` (atomically replaced); returns the row count"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [row for row in csv.DictReader(f)]
+    data = build(rows, source_digest(csv_path))
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, snapshot_path)  # workers compiling at the same time all end up mapping a whole file
+    return len(rows)
+
+
+# ================= READER =================
+class NamasteSnapshot:
+    """
+    Read-only view over a compiled snapshot. Opened from a file it is
+    memory-mapped, so every worker on the host shares one page-cache copy;
+    row dicts are only built for the rows a lookup returns.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        (magic, fmt, bom, digest, self._count, indexed, pool_off, _, fields_off, code_off, term_off,
+         biomedical_off, blob_off, blob_len, starts_off) = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION or bom != BYTE_ORDER_MARK:
+            raise ValueError("Not a compatible NAMASTE snapshot")
+        self.version = digest.decode("ascii")
+        view = memoryview(buf)
+        self._pool_off = pool_off
+        self._fields = view[fields_off:fields_off + self._count * FIELDS * 8].cast("I")
+        self._code_index = view[code_off:code_off + indexed * 4].cast("I")
+        self._term_index = view[term_off:term_off + indexed * 4].cast("I")
+        self._biomedical_index = view[biomedical_off:biomedical_off + indexed * 4].cast("I")
+        self._blob_off, self._blob_len = blob_off, blob_len
+        self._starts = view[starts_off:starts_off + (self._count + 1) * 4].cast("I")
+
+    @classmethod
+    def open(cls, csv_path: str, snapshot_path: str) -> "NamasteSnapshot":
+        """Map `snapshot_path`, recompiling it first when it is missing or older than the CSV's contents"""
+        digest = source_digest(csv_path) if os.path.exists(csv_path) else None
+        snapshot = cls._map(snapshot_path) if os.path.exists(snapshot_path) else None
+        if snapshot is not None and (digest is None or snapshot.version == digest):
+            return snapshot
+        if digest is None:
+            logger.warning("NAMASTE CSV not found, terminology is empty", extra={"path": csv_path})
+            return cls(build([], "0" * 16))
+        count = compile_snapshot(csv_path, snapshot_path)
+        logger.info("Compiled NAMASTE snapshot", extra={"rows": count, "path": snapshot_path})
+        return cls._map(snapshot_path)
+
+    @classmethod
+    def _map(cls, path: str) -> Optional["NamasteSnapshot"]:
+        with open(path, "rb") as f:
+            try:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except (ValueError, struct.error):
+                return None  # empty, truncated or from another format version / byte order
+
+    def __len__(self):
+        return self._count
+
+    def _field(self, i: int, field: int) -> bytes:
+        offset, length = self._fields[(i * FIELDS + field) * 2], self._fields[(i * FIELDS + field) * 2 + 1]
+        start = self._pool_off + offset
+        return self._buf[start:start + length]
+
+    def row(self, i: int) -> dict:
+        return {col: self._field(i, field).decode("utf-8") for field, col in enumerate(COLUMNS)}
+
+    def _lower_bound(self, index, field: int, raw: bytes) -> int:
+        lo, hi = 0, len(index)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._field(index[mid], field) < raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, index, field: int, key: str) -> Optional[int]:
+        raw = key.encode("utf-8")
+        lo = self._lower_bound(index, field, raw)
+        if lo < len(index) and self._field(index[lo], field) == raw:
+            return index[lo]
+        return None
+
+    def _equal_run(self, index, field: int, key: str) -> list[int]:
+        """All entries of `index` whose field equals `key`, in index order"""
+        raw = key.encode("utf-8")
+        found = []
+        for j in range(self._lower_bound(index, field, raw), len(index)):
+            if self._field(index[j], field) != raw:
+                break
+            found.append(index[j])
+        return found
+
+    def find_code(self, code: str) -> Optional[int]:
+        return self._find(self._code_index, 0, code)
+
+    def find_term(self, normalized_term: str, last: bool = True) -> Optional[int]:
+        """Row whose Traditional_Term, stripped and lowercased, equals the argument; the last such row, or the first"""
+        if last:
+            return self._find(self._term_index, TERM_KEY, normalized_term)
+        run = self._equal_run(self._term_index, TERM_KEY, normalized_term)
+        return run[-1] if run else None
+
+    def find_biomedical(self, normalized_term: str) -> list[int]:
+        """All rows whose Biomedical_Term, stripped and lowercased, equals the argument (file order)"""
+        return self._equal_run(self._biomedical_index, BIOMEDICAL_KEY, normalized_term)
+
+    def search(self, q: str, limit: int) -> list[int]:
+        """Rows (in file order) whose traditional term, biomedical term or system contains lowercase `q`"""
+        raw = q.encode("utf-8")
+        if b"\0" in raw or b"\n" in raw or limit <= 0:
+            return []
+        found = []
+        pos, end = self._blob_off, self._blob_off + self._blob_len
+        while len(found) < limit:
+            pos = self._buf.find(raw, pos, end)
+            if pos < 0 or pos == end:  # an empty query also "matches" at the very end
+                break
+            i = bisect_right(self._starts, pos - self._blob_off) - 1
+            found.append(i)
+            pos = self._blob_off + self._starts[i + 1]
+        return found
+
+    def narrow(self, rows: list[int], q: str) -> list[int]:
+        """The subset of `rows` that still match `q`; only those rows' blob segments are scanned"""
+        raw = q.encode("utf-8")
+        if b"\0" in raw or b"\n" in raw:
+            return []
+        base, starts, find = self._blob_off, self._starts, self._buf.find
+        return [i for i in rows if find(raw, base + starts[i], base + starts[i + 1]) >= 0]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> NamasteSnapshot:
+    """The process-wide snapshot for the configured NAMASTE CSV"""
+    global _snapshot
+    if _snapshot is None:
+        from core.config import settings
+
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = NamasteSnapshot.open(settings.NAMASTE_CSV_PATH, settings.NAMASTE_SNAPSHOT_PATH)
+    return _snapshot
+
+
+if __name__ == "__main__":
+    import sys
+    from core.config import settings
+
+    target = sys.argv[1] if len(sys.argv) > 1 else settings.NAMASTE_SNAPSHOT_PATH
+    print(f"Compiled {compile_snapshot(settings.NAMASTE_CSV_PATH, target)} rows into {target}")
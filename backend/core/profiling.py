@@ -0,0 +1,216 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+
+# ================= PER-REQUEST STAGES =================
+class RequestTrace:
+    """
+    Time spent per stage (auth, db, upstream, serialization) within one request.
+    Stages can nest: the user lookup during auth counts towards both auth and db.
+    """
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.threads = {threading.get_ident()}  # threads that worked on this request, for the sampler
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] += seconds
+        self.counts[name] += 1
+
+
+_current = ContextVar("request_trace", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.threads.add(threading.get_ident())
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, perf_counter() - start)
+
+
+# every engine, including the async engine's sync core; a no-op outside a traced request
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    if trace is not None:
+        trace.threads.add(threading.get_ident())
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if started and _current.get() is not None:
+        record_stage("db", perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        record_stage("db", perf_counter() - started.pop())
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """Default response class; attributes body encoding to the serialization stage"""
+
+    def render(self, content) -> bytes:
+        with stage("serialization"):
+            return super().render(content)
+
+
+# ================= SAMPLING PROFILER =================
+class StackSampler:
+    """
+    Samples the stacks of the request's threads every `interval` seconds from a
+    side thread and counts them as folded stacks ("file:func;file:func"), the
+    input format of flame graph tools. The event-loop thread is shared, so
+    concurrent requests on the same worker can show up in the samples.
+    """
+
+    def __init__(self, threads: set, interval: float):
+        self.threads = threads
+        self.interval = interval
+        self.samples = 0
+        self._counts = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for tid in list(self.threads):
+                frame = frames.get(tid)
+                if frame is None or tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                self._counts[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self, top: int = 200) -> list[dict]:
+        self._stop.set()
+        self._thread.join()
+        return [{"stack": s, "count": c} for s, c in sorted(self._counts.items(), key=lambda kv: -kv[1])[:top]]
+
+
+# ================= CAPTURED TRACES =================
+# per worker: each process keeps its own most recent SLOW_REQUEST_BUFFER captures
+captured = deque(maxlen=settings.SLOW_REQUEST_BUFFER)
+
+
+def _is_admin_request(headers: dict) -> bool:
+    """Signed token of a user in ADMIN_USERNAMES; checked before routing, so without a user lookup"""
+    from core.auth import decode_access_token, is_admin
+
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return False
+    payload = decode_access_token(auth[7:].strip())
+    return bool(payload) and is_admin(payload.get("sub"))
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware recording per-stage timings for every request. Requests over
+    SLOW_REQUEST_THRESHOLD_MS are captured for /admin/slow-requests. A request is
+    also run under the sampling profiler when an admin sends `X-Profile: 1` (it
+    then gets Server-Timing and X-Profile-Id headers) or it falls in
+    PROFILE_SAMPLE_RATE. Timing stops when the response body is complete, so
+    background tasks are not counted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        requested = headers.get(PROFILE_HEADER) == b"1" and _is_admin_request(headers)
+        sampled = requested or (settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE)
+
+        trace = RequestTrace()
+        token = _current.set(trace)
+        trace_id = uuid.uuid4().hex
+        sampler = StackSampler(trace.threads, settings.PROFILE_INTERVAL_MS / 1000) if sampled else None
+        if sampler:
+            sampler.start()
+        started_at, start = time.time(), perf_counter()
+        status, duration, stages, counts = 500, None, None, None
+
+        async def send_wrapper(message):
+            nonlocal status, duration, stages, counts
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace.stages.items())
+                    extra = [(b"x-profile-id", trace_id.encode())] + ([(b"server-timing", timing.encode())] if timing else [])
+                    message = {**message, "headers": list(message.get("headers", [])) + extra}
+            elif message["type"] == "http.response.body" and not message.get("more_body") and duration is None:
+                duration = perf_counter() - start
+                stages, counts = dict(trace.stages), dict(trace.counts)  # background tasks still see the trace
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if duration is None:
+                duration = perf_counter() - start
+                stages, counts = dict(trace.stages), dict(trace.counts)
+            profile = await asyncio.to_thread(sampler.stop) if sampler else None  # joins the sampler thread
+            if profile is not None or duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                route = scope.get("route")
+                captured.append({
+                    "id": trace_id,
+                    "started_at": started_at,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route.path if route else None,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                    "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in stages.items()},
+                    "stage_calls": counts,
+                    "slow": duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS,
+                    "profile": profile,
+                    "samples": sampler.samples if sampler else 0,
+                })
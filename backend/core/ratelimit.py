@@ -0,0 +1,135 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi import Depends
+
+from core.auth import get_current_user
+from core.config import settings
+from core.resilience import RateLimited
+
+logger = logging.getLogger(__name__)
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, burst: float, cost: float) -> tuple[float, float]:
+    """Token-bucket step: returns (tokens left, seconds until `cost` tokens are available; 0 if allowed)"""
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+# ================= BUCKET STORES =================
+# Each store runs the refill-and-take step atomically for one key. The store
+# follows CACHE_BACKEND, so buckets are shared by exactly the workers that share a cache.
+class MemoryBucketStore:
+    """Per-process buckets: a limit of N per minute becomes N per minute per worker"""
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens, wait = _refill(tokens, updated_at, now, rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+        return wait
+
+
+class SQLiteBucketStore:
+    """Buckets in the shared cache file; BEGIN IMMEDIATE serializes the read-modify-write across workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, wait = _refill(*(row or (burst, now)), now, rate, burst, cost)
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+# same step as _refill, run server-side so concurrent workers cannot interleave
+_TAKE_SCRIPT = """
+local rate, burst, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = math.min(burst, (tonumber(b[1]) or burst) + (now - (tonumber(b[2]) or now)) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared by every worker and host on the Redis server (requires EVAL / Lua scripting)"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, protocol=2, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time(), cost]))
+
+
+def _build_store():
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteBucketStore(settings.CACHE_SQLITE_PATH)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBucketStore(settings.CACHE_REDIS_URL)
+    return MemoryBucketStore()
+
+
+bucket_store = _build_store()
+
+
+# ================= DEPENDENCY =================
+def rate_limited(scope: str, per_minute: int, burst: int):
+    """
+    Dependency that authenticates the caller and charges one token from their
+    `scope` bucket; returns the user like get_current_user. A store outage lets
+    the request through rather than failing it.
+    """
+    rate = per_minute / 60.0
+
+    def dependency(user=Depends(get_current_user)):
+        try:
+            wait = bucket_store.take(f"{scope}:{user.username}", rate, burst)
+        except Exception as e:
+            logger.warning("Rate limit store unavailable", extra={"scope": scope, "error": str(e)})
+            return user
+        if wait > 0:
+            raise RateLimited(f"Rate limit exceeded for {scope}", math.ceil(wait))
+        return user
+
+    return dependency
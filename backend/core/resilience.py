@@ -0,0 +1,224 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"{upstream} is unavailable, circuit open")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class RateLimited(Exception):
+    """Raised when a caller is over its rate limit or an upstream's wait queue is full"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+# ================= CIRCUIT BREAKER =================
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds, letting one trial call through;
+    half-open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == "open" and elapsed >= self.reset_timeout:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise UpstreamUnavailable(self.name, max(self.reset_timeout - elapsed, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Circuit opened", extra={"upstream": self.name, "failures": self._failures})
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# ================= RETRY BUDGET =================
+class RetryBudget:
+    """
+    Retries may add at most `ratio` extra load on top of first attempts
+    (plus a small floor of `min_per_second`), so a degraded upstream is
+    not hammered by every worker retrying at once.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + amount + (now - self._last) * self.min_per_second)
+        self._last = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            self._refill(0)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# ================= CONCURRENCY LIMIT =================
+class ConcurrencyLimiter:
+    """
+    At most `limit` calls in flight to an upstream from this worker. Up to
+    `max_queued` more wait (at most `queue_timeout` seconds) for a slot; beyond
+    that callers are turned away with RateLimited instead of piling up threads.
+    """
+
+    def __init__(self, name: str, limit: int, max_queued: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+
+    def _reject(self):
+        return RateLimited(f"{self.name} is at capacity, retry shortly", max(self.queue_timeout, 1.0))
+
+    def check_capacity(self):
+        """For work queued elsewhere (background jobs): refuse up front if the wait queue is full"""
+        with self._cond:
+            if self.in_flight >= self.limit and self.queued >= self.max_queued:
+                raise self._reject()
+
+    def acquire(self, timeout: float | None = -1):
+        """timeout=-1 uses queue_timeout; None waits as long as it takes (still counted as queued)"""
+        timeout = self.queue_timeout if timeout == -1 else timeout
+        with self._cond:
+            if self.in_flight >= self.limit:
+                if timeout is not None and self.queued >= self.max_queued:
+                    raise self._reject()
+                self.queued += 1
+                try:
+                    if not self._cond.wait_for(lambda: self.in_flight < self.limit, timeout):
+                        raise self._reject()
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, timeout: float | None = -1):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# ================= STALE-WHILE-REVALIDATE =================
+class StaleWhileRevalidateCache:
+    """
+    Entries younger than `fresh_for` are served as-is; entries up to `stale_for`
+    old are served immediately while one background refresh runs. When the
+    upstream fails, a cached value (kept up to twice `stale_for`) is served
+    rather than the error. Entries live on the configured cache backend, so
+    workers sharing a backend share results; refresh de-duplication is per process.
+    """
+
+    def __init__(self, name: str, fresh_for: float, stale_for: float, max_entries: int = 2048, workers: int = 4):
+        from core.cache import make_cache
+
+        self.name = name
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self._cache = make_cache(name, max_entries)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"swr-{name}")
+
+    def _set(self, key, value):
+        # wall-clock timestamps: entries may be read by other processes
+        self._cache.set(key, {"value": value, "fetched_at": time.time()}, ttl=self.stale_for * 2)
+
+    def _refresh(self, key, loader):
+        try:
+            self._set(key, loader())
+        except Exception as e:
+            logger.info("Background refresh failed, keeping stale value", extra={"cache": self.name, "error": str(e)})
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, key, loader):
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < self.fresh_for:
+                return entry["value"]
+            if age < self.stale_for:
+                with self._lock:
+                    start_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                if start_refresh:
+                    self._executor.submit(self._refresh, key, loader)
+                return entry["value"]
+
+        try:
+            value = loader()
+        except Exception:
+            if entry is not None:
+                return entry["value"]
+            raise
+        self._set(key, value)
+        return value
@@ -0,0 +1,124 @@
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.namaste_snapshot import NamasteSnapshot
+from core.utils import normalize_term
+from models.analytics import CodeUsageStat
+from models.audit_logging import Condition
+
+logger = logging.getLogger(__name__)
+
+
+class TerminologyIndex:
+    """
+    NAMASTE terminology over the memory-mapped snapshot (lookups by code and by
+    term, substring search), plus a NAMASTE -> ICD-11 concept map learned from
+    stored Conditions and its inverse for ICD-11 -> NAMASTE suggestions.
+    """
+
+    def __init__(self, snapshot: NamasteSnapshot):
+        self.snapshot = snapshot
+        self.version = snapshot.version  # digest of the source CSV; changes whenever the data does
+        self.concept_map = {}  # NAMASTE_Code -> ICD-11 code
+        self.icd_displays = {}  # ICD-11 code -> display
+        self.reverse_map = {}  # ICD-11 code -> {NAMASTE_Code: times stored together}
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    def by_code(self, namaste_code: str) -> dict | None:
+        i = self.snapshot.find_code(namaste_code)
+        return self.snapshot.row(i) if i is not None else None
+
+    def by_term(self, term: str) -> dict | None:
+        """First row with this traditional term (enrichment has always taken the first)"""
+        i = self.snapshot.find_term(normalize_term(term), last=False)
+        return self.snapshot.row(i) if i is not None else None
+
+    def search(self, term: str, limit: int = 10) -> list[dict]:
+        """Rows whose traditional term, biomedical term or system contains `term` (case-insensitive)"""
+        return [self.snapshot.row(i) for i in self.snapshot.search(normalize_term(term), limit)]
+
+    # ================= CONCEPT MAP =================
+    def add_mapping(self, namaste_code: str | None, icd_code: str | None, icd_display: str | None = None):
+        if not namaste_code or not icd_code:
+            return
+        self.concept_map.setdefault(namaste_code, icd_code)
+        uses = self.reverse_map.setdefault(icd_code, {})
+        uses[namaste_code] = uses.get(namaste_code, 0) + 1
+        if icd_display:
+            self.icd_displays.setdefault(icd_code, icd_display)
+
+    def load_concept_map(self, db: Session):
+        """Most used ICD-11 code per NAMASTE code, read from the code-usage aggregates"""
+        pairs = (
+            db.query(CodeUsageStat.key, CodeUsageStat.count)
+            .filter(CodeUsageStat.dimension == "pair", CodeUsageStat.bucket == "all")
+            .order_by(CodeUsageStat.count.desc())
+            .all()
+        )
+        for key, count in pairs:
+            namaste_code, _, icd_code = key.partition("|")
+            self.concept_map.setdefault(namaste_code, icd_code)
+            self.reverse_map.setdefault(icd_code, {})[namaste_code] = count
+
+        icd_codes = set(self.concept_map.values())
+        if icd_codes:
+            displays = (
+                db.query(Condition.icd_code, func.max(Condition.icd_display))
+                .filter(Condition.icd_code.in_(icd_codes), Condition.icd_display.isnot(None))
+                .group_by(Condition.icd_code)
+                .all()
+            )
+            for icd_code, display in displays:
+                self.icd_displays.setdefault(icd_code, display)
+        logger.info("Loaded %d NAMASTE -> ICD-11 mappings", len(self.concept_map))
+
+    # ================= ENRICHMENT =================
+    def enrich(self, namaste_code=None, namaste_display=None, icd_code=None, icd_display=None) -> dict:
+        """Fill whatever the client left out from the local index; client-supplied values win"""
+        row = self.by_code(namaste_code) if namaste_code else None
+        if row is None and namaste_display:
+            row = self.by_term(namaste_display)
+            if row is not None and namaste_code and row["NAMASTE_Code"] != namaste_code:
+                row = None  # display names another concept than the (unknown) code; take nothing from it
+        if row is not None:
+            namaste_code = namaste_code or row["NAMASTE_Code"]
+            namaste_display = namaste_display or row["Traditional_Term"]
+
+        if not icd_code and namaste_code:
+            icd_code = self.concept_map.get(namaste_code)
+        if not icd_display and icd_code:
+            icd_display = self.icd_displays.get(icd_code)
+
+        return {
+            "namaste_code": namaste_code,
+            "namaste_display": namaste_display,
+            "namaste_system": row["System"] if row is not None else None,
+            "icd_code": icd_code,
+            "icd_display": icd_display,
+        }
+
+    # ================= REVERSE (ICD-11 -> NAMASTE) =================
+    def reverse(self, icd_code: str | None = None, icd_display: str | None = None, limit: int = 10) -> list[dict]:
+        """
+        NAMASTE candidates for an ICD-11 concept, from memory only: codes stored
+        together with `icd_code` (most used first), then rows whose Biomedical_Term
+        equals the ICD display (the given one, or the one learned for the code).
+        """
+        candidates = {}
+        if icd_code:
+            # sorted() copies the dict in one step, so concurrent add_mapping calls are safe
+            for namaste_code, uses in sorted(self.reverse_map.get(icd_code, {}).items(), key=lambda kv: -kv[1]):
+                row = self.by_code(namaste_code)
+                if row is not None:
+                    candidates[namaste_code] = {**row, "match": "mapping", "uses": uses}
+
+        display = icd_display or (self.icd_displays.get(icd_code) if icd_code else None)
+        if display:
+            for i in self.snapshot.find_biomedical(normalize_term(display)):
+                row = self.snapshot.row(i)
+                candidates.setdefault(row["NAMASTE_Code"], {**row, "match": "biomedical_term", "uses": 0})
+        return list(candidates.values())[:limit]
@@ -0,0 +1,226 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+# W3C Trace Context: version-traceid-parentid-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+# ================= SPANS =================
+class Span:
+    """
+    One timed operation of a trace. Spans are written to the exporter when they
+    end; a span built from an incoming traceparent only serves as a parent.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "end_ns", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, kind: str = "internal", attributes: dict = None,
+                 start_ns: int = None):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+
+    @classmethod
+    def remote(cls, traceparent: Optional[str]) -> Optional["Span"]:
+        """The caller's span from a traceparent header / stored value, or None when absent or malformed"""
+        match = TRACEPARENT.match(traceparent or "")
+        if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+            return None
+        span = cls.__new__(cls)
+        span.trace_id, span.span_id = match.groups()
+        return span
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, end_ns: int = None, error: BaseException = None):
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        self.end_ns = end_ns or time.time_ns()
+        exporter.export(self)
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans as JSON lines to TRACE_EXPORT_PATH (nothing is
+    written while it is empty). Each span is one write on an O_APPEND file, so
+    workers on the host can share it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def export(self, span: Span):
+        if not self.enabled:
+            return
+        line = orjson.dumps({
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "kind": span.kind,
+            "start_ns": span.start_ns,
+            "end_ns": span.end_ns,
+            "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+            "status": span.status,
+            "attributes": span.attributes,
+            "pid": os.getpid(),
+        }, default=str) + b"\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "ab", buffering=0)
+            self._file.write(line)
+
+
+exporter = FileSpanExporter(settings.TRACE_EXPORT_PATH)
+
+_current = ContextVar("current_span", default=None)
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+def start_span(name: str, kind: str = "internal", **attributes) -> Optional[Span]:
+    """Child of the current span that the caller ends itself, without becoming current; None when untraced"""
+    parent = _current.get()
+    if not exporter.enabled or parent is None:
+        return None
+    return Span(name, parent, kind, attributes)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", parent: Span = None, root: bool = False, **attributes):
+    """
+    Child span of `parent` (default: the current span) for the duration of the
+    block. Without a parent nothing is recorded unless `root` is set, so helpers
+    shared with untraced code paths stay silent there.
+    """
+    parent = parent or _current.get()
+    if not exporter.enabled or (parent is None and not root):
+        yield None
+        return
+    s = Span(name, parent, kind, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.end(error=e)
+        raise
+    else:
+        s.end()
+    finally:
+        _current.reset(token)
+
+
+def record_span(name: str, start_ns: int, end_ns: int = None, parent: Span = None, **attributes):
+    """A child of `parent` (default: the current span) for a period that was not wrapped in a block (e.g. time spent queued)"""
+    parent = parent or _current.get()
+    if exporter.enabled and parent is not None:
+        Span(name, parent, attributes=attributes, start_ns=start_ns).end(end_ns)
+
+
+# ================= DATABASE =================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if exporter.enabled and parent is not None:
+        conn.info.setdefault("spans", []).append(Span("db.query", parent, "client", {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:300],
+        }))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("spans")
+    if spans:
+        s = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            s.attributes["db.rowcount"] = cursor.rowcount
+        s.end()
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    spans = context.connection.info.get("spans") if context.connection is not None else None
+    if spans:
+        spans.pop().end(error=context.original_exception)
+
+
+# ================= HTTP =================
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per request, continuing the caller's
+    trace when it sends a traceparent header. The span ends when the response
+    body is complete; background tasks started by the request stay in its trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not exporter.enabled:
+            return await self.app(scope, receive, send)
+
+        parent = Span.remote(dict(scope["headers"]).get(b"traceparent", b"").decode("latin-1"))
+        s = Span(f"{scope['method']} {scope['path']}", parent, "server", {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        token = _current.set(s)
+
+        def finish(error: BaseException = None):
+            if s.end_ns is not None:
+                return
+            route = scope.get("route")
+            if route is not None:
+                s.name = f"{scope['method']} {route.path}"
+                s.attributes["http.route"] = route.path
+            s.end(error=error)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                s.attributes["http.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    s.status = "error"
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            finish(e)
+            raise
+        else:
+            finish()
+        finally:
+            _current.reset(token)
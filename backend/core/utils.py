@@ -1,7 +1,18 @@
 import re
+import hashlib
+import orjson
 from fastapi import HTTPException
 import requests, logging
+import time
+import threading
+from time import perf_counter
+from requests.adapters import HTTPAdapter
 from core.config import settings
+from core.metrics import WHO_REQUEST_DURATION, WHO_RESPONSES, WHO_RETRIES, record_cache
+from core.resilience import CircuitBreaker, ConcurrencyLimiter, RetryBudget, StaleWhileRevalidateCache, backoff_delay
+from core.cache import make_cache
+from core.profiling import record_stage
+from core.tracing import start_span
 
 def strip_html(text: str) -> str:
     if not text:
@@ -11,26 +22,130 @@ def strip_html(text: str) -> str:
 def normalize_term(s: str) -> str:
     return s.strip().lower() if s else ""
 
+def content_hash(resource) -> str:
+    """sha256 over canonical JSON (sorted keys, no whitespace) so equal resources hash equally"""
+    return hashlib.sha256(orjson.dumps(resource, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
 def ensure_fhir_bundle(payload: dict):
     if payload.get("resourceType", "").lower() != "bundle":
         raise HTTPException(status_code=400, detail="Not a FHIR Bundle")
     return payload
 
 
-TOKEN_URL = "https://icdaccessmanagement.who.int/connect/token"
+TOKEN_URL = settings.WHO_TOKEN_URL
+
+logger = logging.getLogger(__name__)
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# pooled keep-alive connections to WHO, shared by all threads
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_maxsize=32))
+_session.mount("http://", HTTPAdapter(pool_maxsize=32))
+who_breaker = CircuitBreaker("who_icd", settings.WHO_BREAKER_FAILURES, settings.WHO_BREAKER_RESET_SECONDS)
+who_retry_budget = RetryBudget(settings.WHO_RETRY_BUDGET_RATIO)
+who_limiter = ConcurrencyLimiter("who_icd", settings.WHO_MAX_IN_FLIGHT, settings.WHO_MAX_QUEUED, settings.WHO_QUEUE_TIMEOUT)
+who_search_cache = StaleWhileRevalidateCache("who_search", settings.WHO_SEARCH_FRESH_SECONDS, settings.WHO_SEARCH_STALE_SECONDS)
+
+
+def who_request(endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Single choke point for WHO ICD API traffic (token / search / entity).
+    Every attempt waits for a concurrency slot, has a connect/read timeout and goes through the circuit breaker;
+    transport errors and 429/5xx are retried with jittered backoff while the
+    global retry budget allows. Times the call and counts statuses per endpoint.
+    """
+    kwargs.setdefault("timeout", (settings.WHO_CONNECT_TIMEOUT, settings.WHO_READ_TIMEOUT))
+    who_retry_budget.deposit()
+    attempt = 0
+    while True:
+        who_limiter.acquire()
+        try:
+            who_breaker.before_call()
+            try:
+                start = perf_counter()
+                call = start_span(f"who.{endpoint}", "client", **{"http.method": method, "http.url": url, "who.attempt": attempt})
+                if call is not None:
+                    kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": call.traceparent}
+                res, error = None, None
+                try:
+                    res = _session.request(method, url, **kwargs)
+                except requests.RequestException as e:
+                    error = e
+            except BaseException:
+                # not retried, but still ends a half-open trial; otherwise the circuit would never close again
+                who_breaker.record_failure()
+                raise
+        finally:
+            who_limiter.release()
+        duration = perf_counter() - start
+        WHO_REQUEST_DURATION.labels(endpoint).observe(duration)
+        record_stage("upstream", duration)
+        if call is not None:
+            call.attributes["http.status_code"] = res.status_code if res is not None else None
+            call.end(error=error)
+        WHO_RESPONSES.labels(endpoint, "error" if error else str(res.status_code)).inc()
+
+        failed = error is not None or res.status_code in RETRYABLE_STATUS
+        if failed:
+            who_breaker.record_failure()
+        else:
+            who_breaker.record_success()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("WHO request", extra={"endpoint": endpoint, "url": url, "attempt": attempt,
+                                               "status": res.status_code if res is not None else "error",
+                                               "duration_ms": round(duration * 1000, 1)})
+
+        if not failed or attempt >= settings.WHO_MAX_RETRIES or not who_retry_budget.try_withdraw():
+            if error is not None:
+                raise error
+            return res
+        attempt += 1
+        WHO_RETRIES.labels(endpoint).inc()
+        time.sleep(backoff_delay(attempt, base=0.1, cap=1.0))
+
+
+_token_lock = threading.Lock()
+_token = {"value": None, "expires_at": 0.0}
+# second level behind the per-process copy, so workers sharing a backend fetch one token between them
+_token_cache = make_cache("who_token", max_entries=1)
+
+
+def _remember_token(value: str, expires_at: float):
+    """expires_at is wall-clock; the local copy is tracked on the monotonic clock"""
+    _token["value"] = value
+    _token["expires_at"] = time.monotonic() + (expires_at - time.time())
+
 
 def get_who_token() -> str:
-    payload = {
-        "client_id": settings.WHO_CLIENT_ID,
-        "client_secret": settings.WHO_CLIENT_SECRET,
-        "scope": "icdapi_access",
-        "grant_type": "client_credentials",
-    }
-    res = requests.post(TOKEN_URL, data=payload, verify=True)
-    res.raise_for_status()
-    return res.json()["access_token"]
+    """OAuth client-credentials token, reused until shortly before it expires"""
+    if _token["value"] and time.monotonic() < _token["expires_at"]:
+        record_cache("who_token", True)
+        return _token["value"]
+    with _token_lock:
+        # another thread may have refreshed it while we waited
+        if _token["value"] and time.monotonic() < _token["expires_at"]:
+            record_cache("who_token", True)
+            return _token["value"]
+        shared = _token_cache.get(settings.WHO_CLIENT_ID)
+        if shared is not None and time.time() < shared["expires_at"]:
+            _remember_token(shared["value"], shared["expires_at"])
+            return _token["value"]
+        payload = {
+            "client_id": settings.WHO_CLIENT_ID,
+            "client_secret": settings.WHO_CLIENT_SECRET,
+            "scope": "icdapi_access",
+            "grant_type": "client_credentials",
+        }
+        res = who_request("token", "POST", TOKEN_URL, data=payload, verify=True)
+        res.raise_for_status()
+        body = res.json()
+        lifetime = max(int(body.get("expires_in", 3600)) - 60, 30)
+        _remember_token(body["access_token"], time.time() + lifetime)
+        _token_cache.set(settings.WHO_CLIENT_ID, {"value": _token["value"], "expires_at": time.time() + lifetime}, ttl=lifetime)
+        return _token["value"]
 
-logging.basicConfig(level=logging.INFO)
 
 def call_who_icd(uri: str):
     token = get_who_token()
@@ -41,13 +156,11 @@ def call_who_icd(uri: str):
         "API-Version": "v2",
     }
 
-    logging.info(f"🌐 Calling WHO ICD API: {uri}")
-    logging.info(f"🔑 Headers: Authorization: Bearer {token[:10]}...")
-
-    res = requests.get(uri, headers=headers, verify=True)
+    res = who_request("search", "GET", uri, headers=headers, verify=True)
+    res.raise_for_status()
+    return res.json()
 
-    logging.info(f"📥 WHO API Response Status: {res.status_code}")
-    logging.info(f"📄 WHO API Response Body (truncated): {str(res.text)[:200]}...")
 
-    res.raise_for_status()
-    return res.json()
\ No newline at end of file
+def search_who_cached(uri: str):
+    """WHO search through the stale-while-revalidate cache"""
+    return who_search_cache.get_or_load(uri, lambda: call_who_icd(uri))
@@ -1,18 +1,73 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+# async drivers used for the request path, by backend
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def database_url() -> URL:
+    url = settings.DATABASE_URL
+    if url.startswith("postgres://"):  # scheme used by some hosting providers
+        url = "postgresql://" + url[len("postgres://"):]
+    return make_url(url)
+
+
+def async_database_url() -> URL:
+    if settings.ASYNC_DATABASE_URL:
+        return make_url(settings.ASYNC_DATABASE_URL)
+    url = database_url()
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def engine_options(url: URL) -> dict:
+    if url.get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def apply_sqlite_pragmas(engine):
+    """
+    WAL lets readers run alongside the single writer; synchronous=NORMAL is
+    durable under WAL except for power loss, and skips an fsync per commit.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+# sync engine: background tasks (AI jobs, bulk export), migrations and startup work
+engine = create_engine(database_url(), **engine_options(database_url()))
+# plain sessionmaker: FastAPI runs a request's dependencies and endpoint on different
+# threadpool threads, so a thread-local scoped_session ends up shared between requests
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# async engine: request handlers
+async_engine = create_async_engine(async_database_url(), **engine_options(async_database_url()))
+if engine.dialect.name == "sqlite":
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-def create_tables():
-    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,46 @@
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from db.database import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+BASELINE_REVISION = "0001"
+# arbitrary constant key so concurrent workers don't run the same migration twice
+MIGRATION_LOCK_ID = 727_011
+
+
+def alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def upgrade_to_head(bind=None):
+    """
+    Bring the schema of `bind` (default: the configured database) to the
+    latest revision. Databases created by the old create_all() startup (tables
+    present, no alembic_version) are stamped with the baseline first, the
+    schema that startup built, so every later revision runs against them.
+    """
+    config = alembic_config()
+    with (bind or engine).begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # released when the transaction ends
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        config.attributes["connection"] = connection
+
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "conditions" in tables:
+            logger.info("Stamping existing schema with the baseline revision")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    upgrade_to_head()
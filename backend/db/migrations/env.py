@@ -0,0 +1,33 @@
+from alembic import context
+
+from db.database import Base, engine
+from models import model, job, analytics, idempotency, audit_logging  # noqa: F401 - register tables
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=engine.url, target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # upgrade_to_head() passes its (locked) connection; the alembic CLI does not
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
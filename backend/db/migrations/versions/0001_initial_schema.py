@@ -0,0 +1,84 @@
+"""initial schema (the tables the original create_all() startup built)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_logs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('actor', sa.String(), nullable=True),
+    sa.Column('action', sa.String(), nullable=True),
+    sa.Column('resource', sa.String(), nullable=True),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('conditions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('patient_id', sa.String(), nullable=False),
+    sa.Column('namaste_code', sa.String(), nullable=True),
+    sa.Column('namaste_display', sa.String(), nullable=True),
+    sa.Column('icd_code', sa.String(), nullable=True),
+    sa.Column('icd_display', sa.String(), nullable=True),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('created_by', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('raw_fhir', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('conditions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_conditions_patient_id'), ['patient_id'], unique=False)
+
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_jobs_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_jobs_job_id'), ['job_id'], unique=True)
+
+    op.create_table('users',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_jobs_job_id'))
+        batch_op.drop_index(batch_op.f('ix_jobs_id'))
+
+    op.drop_table('jobs')
+    with op.batch_alter_table('conditions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conditions_patient_id'))
+
+    op.drop_table('conditions')
+    op.drop_table('audit_logs')
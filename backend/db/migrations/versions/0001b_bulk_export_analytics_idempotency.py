@@ -0,0 +1,113 @@
+"""bulk export jobs, code-usage aggregates, idempotent ingestion, condition icd_stem
+
+Revision ID: 0001b
+Revises: 0001
+Create Date: 2026-10-19
+
+Everything added between the baseline and 0002. Databases created by an
+earlier copy of 0001 already have these objects, so each one is only created
+when it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from core.icd_graph import stem_code
+
+
+revision = '0001b'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'bulk_export_jobs' not in tables:
+        op.create_table('bulk_export_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('request_url', sa.String(), nullable=False),
+        sa.Column('resource_type', sa.String(), nullable=True),
+        sa.Column('since', sa.DateTime(), nullable=True),
+        sa.Column('compress', sa.Boolean(), nullable=True),
+        sa.Column('transaction_time', sa.DateTime(), nullable=True),
+        sa.Column('exported_count', sa.Integer(), nullable=True),
+        sa.Column('output', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('bulk_export_jobs', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_bulk_export_jobs_id'), ['id'], unique=False)
+            batch_op.create_index(batch_op.f('ix_bulk_export_jobs_job_id'), ['job_id'], unique=True)
+
+    if 'code_usage_stats' not in tables:
+        op.create_table('code_usage_stats',
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('bucket', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'key', 'bucket')
+        )
+        with op.batch_alter_table('code_usage_stats', schema=None) as batch_op:
+            batch_op.create_index('ix_code_usage_top', ['dimension', 'bucket', 'count'], unique=False)
+
+    if 'idempotency_keys' not in tables:
+        op.create_table('idempotency_keys',
+        sa.Column('actor', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('request_hash', sa.String(), nullable=False),
+        sa.Column('response', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('actor', 'key')
+        )
+
+    columns = {c['name'] for c in inspector.get_columns('conditions')}
+    indexes = {i['name'] for i in inspector.get_indexes('conditions')}
+    with op.batch_alter_table('conditions', schema=None) as batch_op:
+        if 'content_hash' not in columns:
+            batch_op.add_column(sa.Column('content_hash', sa.String(), nullable=True))
+        if 'ix_conditions_content_hash' not in indexes:
+            batch_op.create_index(batch_op.f('ix_conditions_content_hash'), ['content_hash'], unique=True)
+        if 'ix_conditions_icd_code' not in indexes:
+            batch_op.create_index(batch_op.f('ix_conditions_icd_code'), ['icd_code'], unique=False)
+        if 'icd_stem' not in columns:
+            batch_op.add_column(sa.Column('icd_stem', sa.String(), nullable=True))
+        if 'ix_conditions_icd_stem' not in indexes:
+            batch_op.create_index(batch_op.f('ix_conditions_icd_stem'), ['icd_stem'], unique=False)
+
+    conditions = sa.table('conditions', sa.column('id', sa.String()), sa.column('icd_code', sa.String()),
+                          sa.column('icd_stem', sa.String()))
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(conditions.c.id, conditions.c.icd_code).where(
+        conditions.c.icd_code.isnot(None), conditions.c.icd_stem.is_(None))).all()
+    update = conditions.update().where(conditions.c.id == sa.bindparam('row_id')).values(icd_stem=sa.bindparam('stem'))
+    for i in range(0, len(rows), BACKFILL_BATCH_SIZE):
+        bind.execute(update, [{'row_id': row_id, 'stem': stem_code(code)} for row_id, code in rows[i:i + BACKFILL_BATCH_SIZE]])
+
+
+def downgrade():
+    with op.batch_alter_table('conditions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conditions_icd_stem'))
+        batch_op.drop_column('icd_stem')
+        batch_op.drop_index(batch_op.f('ix_conditions_icd_code'))
+        batch_op.drop_index(batch_op.f('ix_conditions_content_hash'))
+        batch_op.drop_column('content_hash')
+
+    op.drop_table('idempotency_keys')
+    with op.batch_alter_table('code_usage_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_code_usage_top')
+
+    op.drop_table('code_usage_stats')
+    with op.batch_alter_table('bulk_export_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bulk_export_jobs_job_id'))
+        batch_op.drop_index(batch_op.f('ix_bulk_export_jobs_id'))
+
+    op.drop_table('bulk_export_jobs')
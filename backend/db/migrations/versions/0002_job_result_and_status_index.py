@@ -0,0 +1,26 @@
+"""job result column and status index
+
+Revision ID: 0002
+Revises: 0001b
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('result', sa.JSON(), nullable=True))
+        batch_op.create_index('ix_jobs_status_created_at', ['status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_jobs_status_created_at')
+        batch_op.drop_column('result')
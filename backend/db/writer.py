@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from db.database import engine
+
+
+class WriteQueue:
+    """
+    Runs write transactions on dedicated writer thread(s). Each call gets its own
+    session, is committed on success and rolled back on error; the return value
+    (or exception) comes back through a future. With one worker, writes queue up
+    instead of contending for SQLite's database lock, while reads keep running
+    in parallel on their own connections under WAL.
+    """
+
+    def __init__(self, session_factory, workers: int = 1):
+        self._session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-writer")
+
+    def _execute(self, fn, args, kwargs):
+        db = self._session_factory()
+        try:
+            result = fn(db, *args, **kwargs)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue `fn(db, *args, **kwargs)`; it runs in the caller's context, so its queries count towards the request"""
+        return self._executor.submit(contextvars.copy_context().run, self._execute, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """From sync code (background tasks): wait for the write to commit"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn, *args, **kwargs):
+        """From request handlers: await the write without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def add_async(self, *rows):
+        """Insert ORM objects in one write transaction"""
+        return await self.run_async(lambda db: db.add_all(rows))
+
+
+def _workers() -> int:
+    if engine.dialect.name == "sqlite" and settings.SQLITE_SERIALIZED_WRITES:
+        return 1
+    return settings.DB_POOL_SIZE
+
+
+# expire_on_commit=False so objects returned from a write stay readable after its session closes
+write_queue = WriteQueue(sessionmaker(bind=engine, autoflush=False, expire_on_commit=False), _workers())
@@ -1,39 +1,67 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 from contextlib import asynccontextmanager
-import os, csv
+import asyncio
 
 from core.config import settings
-from db.database import create_tables
-from routers import auth_router, user_router, terminology_router, condition_router, ai_response_router, audit_logging
+from core.logging_config import configure_logging
+from core.metrics import MetricsMiddleware, render_metrics
+from core.compression import CompressionMiddleware
+from core.profiling import ProfilingMiddleware, TimedORJSONResponse
+from core.tracing import TracingMiddleware
+from core.resilience import UpstreamUnavailable, RateLimited
+from db.database import SessionLocal, async_engine
+from db.migrate import upgrade_to_head
+from core.analytics import backfill_code_usage
+from core.terminology import TerminologyIndex
+from core.namaste_snapshot import get_snapshot
+from core.icd_graph import IcdGraph
+from core.job_reaper import run_job_reaper
+from routers import auth_router, user_router, terminology_router, condition_router, ai_response_router, audit_logging, bulk_export_router, analytics_router, icd_graph_router, admin_router
+
+
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("--- Starting up application ---")
 
-    # Load NAMASTE CSV
-    csv_path = os.path.join(os.path.dirname(__file__), "data", "namaste.csv")
-    if os.path.exists(csv_path):
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            app.state.namaste_data = [row for row in reader]
-        print(f"Loaded {len(app.state.namaste_data)} NAMASTE terms.")
+    upgrade_to_head()
+    print("Database migrated to the latest revision.")
+
+    # Map the compiled NAMASTE snapshot (plus concept map from stored Conditions)
+    db = SessionLocal()
+    try:
+        backfill_code_usage(db)
+        app.state.terminology = TerminologyIndex(get_snapshot())
+        app.state.terminology.load_concept_map(db)
+    finally:
+        db.close()
+    if len(app.state.terminology):
+        print(f"Loaded {len(app.state.terminology)} NAMASTE terms.")
     else:
-        app.state.namaste_data = []
-        print(f"Warning: NAMASTE CSV not found at {csv_path}")
+        print(f"Warning: NAMASTE CSV not found at {settings.NAMASTE_CSV_PATH}")
+
+    # ICD-11 MMS hierarchy for ancestor/descendant queries (empty if no snapshot is present)
+    app.state.icd_graph = IcdGraph.load(settings.ICD_SNAPSHOT_PATH)
 
-    create_tables()
-    print("Database tables checked/created.")
+    # purge finished AI jobs past the retention window
+    reaper = asyncio.create_task(run_job_reaper()) if settings.JOB_RETENTION_DAYS > 0 else None
 
     yield
+    if reaper is not None:
+        reaper.cancel()
+    await async_engine.dispose()
     print("--- Shutting down application ---")
 
 
 app = FastAPI(
     title="NAMASTE ↔ ICD-11 Terminology Microservice",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=TimedORJSONResponse
 )
 
 
@@ -45,6 +73,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 
 # --- Custom OpenAPI (secured by default except /register, /token) ---
@@ -80,6 +112,33 @@ def health_check():
     return {"status": "ok", "message": "Ayush FHIR Coder is running"}
 
 
+# --- Upstream circuit open: fail fast ---
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+# --- Over a rate limit or upstream queue full: tell the client when to retry ---
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return ORJSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+# --- Metrics (Prometheus text format) ---
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
 # --- Routers ---
 app.include_router(auth_router.router, prefix=settings.API_PREFIX)
 app.include_router(user_router.router, prefix=settings.API_PREFIX)
@@ -88,6 +147,10 @@ app.include_router(condition_router.router, prefix=settings.API_PREFIX)
 
 app.include_router(ai_response_router.router, prefix=settings.API_PREFIX)
 app.include_router(audit_logging.router, prefix=settings.API_PREFIX)
+app.include_router(bulk_export_router.router, prefix=settings.API_PREFIX)
+app.include_router(analytics_router.router, prefix=settings.API_PREFIX)
+app.include_router(icd_graph_router.router, prefix=settings.API_PREFIX)
+app.include_router(admin_router.router, prefix=settings.API_PREFIX)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, Index
+from db.database import Base
+
+
+class CodeUsageStat(Base):
+    """
+    Materialized code-usage counters, maintained incrementally from the
+    bundle upload path so dashboards never GROUP BY over `conditions`.
+    dimension: namaste | pair | system
+    bucket: 'all' for all-time totals, otherwise a UTC day (YYYY-MM-DD)
+    """
+    __tablename__ = "code_usage_stats"
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_code_usage_top", "dimension", "bucket", "count"),
+    )
@@ -38,9 +38,11 @@ class Condition(Base):
     patient_id = Column(String, index=True, nullable=False)
     namaste_code = Column(String, nullable=True)
     namaste_display = Column(String, nullable=True)
-    icd_code = Column(String, nullable=True)
+    icd_code = Column(String, index=True, nullable=True)
+    icd_stem = Column(String, index=True, nullable=True)  # icd_code without postcoordination, for subtree queries
     icd_display = Column(String, nullable=True)
     source = Column(String, nullable=True)  # e.g., 'bundle-upload' or 'manual'
     created_by = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    raw_fhir = Column(JSON, nullable=True)  # store full fhir resource for audit
\ No newline at end of file
+    raw_fhir = Column(JSON, nullable=True)  # store full fhir resource for audit
+    content_hash = Column(String, unique=True, index=True, nullable=True)  # sha256 of canonical raw_fhir, dedups retried uploads
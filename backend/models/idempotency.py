@@ -0,0 +1,14 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON
+from db.database import Base
+
+
+class IdempotencyRecord(Base):
+    """Response of a completed request, replayed when a client retries with the same Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+
+    actor = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # content hash of the original request body
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, Index
 from sqlalchemy.sql import func
 from db.database import Base
 
@@ -7,8 +7,34 @@ class NamasteJob(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(String, unique=True, index=True, nullable=False)
-    prompt = Column(Text, nullable=True)
+    prompt = Column(Text, nullable=True)  # raw model output, kept only when it could not be validated
+    result = Column(JSON, nullable=True)  # validated diagnoses: [{"diagnosis", "NAMASTE_Code", "ICD/TM", "Biomedical"}]
     status = Column(String, default="pending")  # Options: pending, processing, completed, failed
     error = Column(Text, nullable=True)
+    traceparent = Column(String(55), nullable=True)  # W3C trace context of the creating request, continued by the worker
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    completed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # status filters without scanning the table: the retention reaper (finished jobs by age) and the metrics gauge (counts per status)
+    __table_args__ = (
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
+
+
+class BulkExportJob(Base):
+    __tablename__ = "bulk_export_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True, nullable=False)
+    status = Column(String, default="pending")  # Options: pending, processing, completed, failed
+    request_url = Column(String, nullable=False)
+    resource_type = Column(String, default="Condition")
+    since = Column(DateTime, nullable=True)  # FHIR _since parameter
+    compress = Column(Boolean, default=False)  # gzip NDJSON files
+    transaction_time = Column(DateTime, nullable=True)
+    exported_count = Column(Integer, default=0)
+    output = Column(JSON, nullable=True)  # [{"type", "file", "count"}]
+    error = Column(Text, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.auth import require_admin
+from core.profiling import captured
+from core.config import settings
+
+router = APIRouter(tags=["Admin"])
+
+
+@router.get("/admin/slow-requests")
+def list_slow_requests(
+    limit: int = Query(50, ge=1, le=500),
+    min_duration_ms: float = Query(0, ge=0),
+    _admin=Depends(require_admin)
+):
+    """
+    Captured requests of this worker, newest first: every request over
+    SLOW_REQUEST_THRESHOLD_MS plus profiled ones, with per-stage timings.
+    Stack samples are left out here; fetch a capture by id for its profile.
+    """
+    traces = []
+    for trace in reversed(list(captured)):
+        if trace["duration_ms"] < min_duration_ms:
+            continue
+        traces.append({key: value for key, value in trace.items() if key != "profile"})
+        if len(traces) >= limit:
+            break
+    return {"threshold_ms": settings.SLOW_REQUEST_THRESHOLD_MS, "traces": traces}
+
+
+@router.get("/admin/slow-requests/{trace_id}")
+def get_slow_request(trace_id: str, _admin=Depends(require_admin)):
+    """One capture including its folded stack samples when it was profiled"""
+    for trace in list(captured):  # the middleware appends from the event loop while this runs in the threadpool
+        if trace["id"] == trace_id:
+            return trace
+    raise HTTPException(status_code=404, detail="Trace not found (evicted or captured by another worker)")
@@ -1,22 +1,38 @@
+import time
 import uuid
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from db.database import get_db, SessionLocal
+from db.database import get_db
+from db.writer import write_queue
 from models.job import NamasteJob
-from schemas.job import NamasteJobCreate, NamasteJobStatus
-from core.ai_response import NamasteAiResponse  # the generator we built
+from schemas.job import NamasteJobCreate, NamasteJobStatus, NamasteJobStatusQuery, NamasteJobStatusBatch
+from core.ai_response import NamasteAiResponse, gemini_limiter  # the generator we built
+from core.config import settings
+from core.ratelimit import rate_limited
+from core.auth import get_current_user
+from core.tracing import current_traceparent
 
 router = APIRouter(tags=["NamasteAI"])
 
 
+def _insert_job(db: Session, job: NamasteJob) -> NamasteJob:
+    db.add(job)
+    db.flush()
+    db.refresh(job)  # load the server-side created_at default
+    return job
+
+
 @router.post("/create-namaste-job", response_model=NamasteJobStatus)
-def create_namaste_job(
+async def create_namaste_job(
     request: NamasteJobCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    _user=Depends(rate_limited("ai", settings.RATE_LIMIT_AI_PER_MINUTE, settings.RATE_LIMIT_AI_BURST)),
 ):
+    gemini_limiter.check_capacity()
     job_id = str(uuid.uuid4())
     job = NamasteJob(
         job_id=job_id,
@@ -24,17 +40,16 @@ def create_namaste_job(
         prompt=None,
         error=None,
         completed_at=None,
+        traceparent=current_traceparent(),
     )
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+    await write_queue.run_async(_insert_job, job)
 
-    # Add background AI task
+    # Add background AI task (runs on its own session after the response is sent)
     background_tasks.add_task(
-        NamasteAiResponse.generate,
-        db,
+        NamasteAiResponse.run,
         job_id,
         request.symptoms,
+        time.time_ns(),  # start of the job's queue wait
     )
 
     return NamasteJobStatus(
@@ -48,9 +63,21 @@ def create_namaste_job(
 
 
 @router.get("/namaste-job/{job_id}", response_model=NamasteJobStatus)
-def get_namaste_job(job_id: str, db: Session = Depends(get_db)):
-    job = db.query(NamasteJob).filter(NamasteJob.job_id == job_id).first()
+async def get_namaste_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.scalar(select(NamasteJob).where(NamasteJob.job_id == job_id))
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     return NamasteJobStatus.from_orm(job)
+
+
+@router.post("/namaste-jobs/status", response_model=NamasteJobStatusBatch)
+async def get_namaste_jobs_status(query: NamasteJobStatusQuery, db: AsyncSession = Depends(get_db), _user=Depends(get_current_user)):
+    """Status of up to 500 jobs in one indexed IN lookup, instead of polling each job"""
+    job_ids = list(dict.fromkeys(query.job_ids))
+    jobs = (await db.scalars(select(NamasteJob).where(NamasteJob.job_id.in_(job_ids)))).all()
+    found = {job.job_id: job for job in jobs}
+    return NamasteJobStatusBatch(
+        jobs=[NamasteJobStatus.model_validate(found[job_id]) for job_id in job_ids if job_id in found],
+        missing=[job_id for job_id in job_ids if job_id not in found],
+    )
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+
+from db.database import get_db
+from core.analytics import top_codes, daily_counts
+from core.auth import get_current_user
+
+router = APIRouter(tags=["Analytics"])
+
+
+@router.get("/analytics/code-usage")
+async def get_code_usage(
+    dimension: Literal["namaste", "pair", "system"] = "namaste",
+    k: int = Query(10, ge=1, le=100),
+    days: int = Query(30, ge=0, le=366),
+    db: AsyncSession = Depends(get_db),
+    _user=Depends(get_current_user)
+):
+    """
+    Top-k codes for a dimension plus daily counts for those keys over the last `days` days.
+    Served from the code_usage_stats aggregate table, never from a scan of conditions.
+    """
+    top = await db.run_sync(top_codes, dimension, k)
+    end_day = datetime.utcnow().date()
+    start_day = end_day - timedelta(days=days)
+    series = await db.run_sync(daily_counts, dimension, [t["key"] for t in top], start_day.isoformat(), end_day.isoformat())
+    return {
+        "dimension": dimension,
+        "top": top,
+        "series": series,
+    }
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from db.database import get_db
@@ -9,11 +10,11 @@ from core.auth import get_current_user
 router = APIRouter(tags=["Audit"])
 
 @router.get("/logs", response_model=List[AuditLogResponse])
-def get_audit_logs(
-    db: Session = Depends(get_db),
+async def get_audit_logs(
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
     # _user=Depends(get_current_user)
 ):
-    logs = db.query(AuditLog).order_by(AuditLog.created_at.desc()).offset(skip).limit(limit).all()
+    logs = (await db.scalars(select(AuditLog).order_by(AuditLog.created_at.desc()).offset(skip).limit(limit))).all()
     return logs
@@ -1,9 +1,12 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.database import get_db
+from db.writer import write_queue
 from models import model
 from pydantic import BaseModel
 from core.auth import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -30,24 +33,23 @@ class Token(BaseModel):
 
 # ================= REGISTER =================
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(model.User).filter(model.User.username == user.username).first():
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    if await db.scalar(select(model.User).where(model.User.username == user.username)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
     db_user = model.User(
         username=user.username,
         full_name=user.full_name,
-        hashed_password=get_password_hash(user.password)
+        # bcrypt is deliberately slow; keep it off the event loop
+        hashed_password=await run_in_threadpool(get_password_hash, user.password)
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await write_queue.add_async(db_user)
     return db_user
 
 # ================= LOGIN =================
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(model.User).filter(model.User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(model.User).where(model.User.username == form_data.username))
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
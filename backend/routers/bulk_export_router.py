@@ -0,0 +1,124 @@
+import os
+import uuid
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.database import get_db
+from db.writer import write_queue
+from models.job import BulkExportJob
+from models import audit_logging
+from core.auth import get_current_user
+from core.bulk_export import (
+    run_bulk_export, export_dir, remove_export_files,
+    NDJSON_CONTENT_TYPE, SUPPORTED_OUTPUT_FORMATS, SUPPORTED_TYPES,
+)
+
+router = APIRouter(tags=["Bulk Export"])
+
+
+def _operation_outcome(diagnostics: str, code: str = "processing") -> dict:
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{"severity": "error", "code": code, "diagnostics": diagnostics}]
+    }
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Conditions store created_at as naive UTC; an offset-aware _since is converted before the offset is dropped"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+# ================= KICK-OFF =================
+@router.get("/$export", status_code=202)
+async def kick_off_export(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    resource_types: str | None = Query(None, alias="_type"),
+    output_format: str = Query(NDJSON_CONTENT_TYPE, alias="_outputFormat"),
+    since: datetime | None = Query(None, alias="_since"),
+    compress: bool = False,
+    _user=Depends(get_current_user)
+):
+    """FHIR Bulk Data system-level export. Poll the Content-Location URL for the manifest."""
+    if output_format not in SUPPORTED_OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported _outputFormat: {output_format}")
+    requested = {t.strip() for t in (resource_types or "Condition").split(",") if t.strip()}
+    unsupported = requested - SUPPORTED_TYPES
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported _type: {', '.join(sorted(unsupported))}")
+
+    job = BulkExportJob(
+        job_id=str(uuid.uuid4()),
+        status="pending",
+        request_url=str(request.url),
+        resource_type="Condition",
+        since=_naive_utc(since) if since else None,
+        compress=compress,
+        transaction_time=datetime.utcnow(),
+        created_by=_user.username,
+    )
+    await write_queue.add_async(
+        job,
+        audit_logging.AuditLog(actor=_user.username, action="bulk-export", resource=job.job_id, details={"request": job.request_url}),
+    )
+
+    background_tasks.add_task(run_bulk_export, job.job_id)
+
+    status_url = str(request.url_for("get_export_status", job_id=job.job_id))
+    return Response(status_code=202, headers={"Content-Location": status_url})
+
+
+# ================= STATUS / MANIFEST =================
+@router.get("/bulkstatus/{job_id}")
+async def get_export_status(job_id: str, request: Request, db: AsyncSession = Depends(get_db), _user=Depends(get_current_user)):
+    job = await db.scalar(select(BulkExportJob).where(BulkExportJob.job_id == job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+
+    if job.status in ("pending", "processing"):
+        return Response(status_code=202, headers={"X-Progress": job.status, "Retry-After": "5"})
+
+    if job.status == "failed":
+        return JSONResponse(status_code=500, content=_operation_outcome(job.error or "Export failed", "exception"))
+
+    return {
+        "transactionTime": job.transaction_time.isoformat() + "Z",
+        "request": job.request_url,
+        "requiresAccessToken": True,
+        "output": [
+            {
+                "type": f["type"],
+                "url": str(request.url_for("download_export_file", job_id=job_id, file_name=f["file"])),
+                "count": f["count"],
+            }
+            for f in (job.output or [])
+        ],
+        "error": [],
+    }
+
+
+@router.delete("/bulkstatus/{job_id}", status_code=202)
+async def delete_export(job_id: str, db: AsyncSession = Depends(get_db), _user=Depends(get_current_user)):
+    job = await db.scalar(select(BulkExportJob).where(BulkExportJob.job_id == job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    await write_queue.run_async(lambda wdb: wdb.query(BulkExportJob).filter(BulkExportJob.job_id == job_id).delete())
+    remove_export_files(job_id)
+    return Response(status_code=202)
+
+
+# ================= FILE DOWNLOAD =================
+@router.get("/bulkstatus/{job_id}/files/{file_name}")
+async def download_export_file(job_id: str, file_name: str, db: AsyncSession = Depends(get_db), _user=Depends(get_current_user)):
+    job = await db.scalar(select(BulkExportJob).where(BulkExportJob.job_id == job_id))
+    if not job or job.status != "completed":
+        raise HTTPException(status_code=404, detail="Export job not found")
+    # only serve files listed in the manifest
+    if file_name not in {f["file"] for f in (job.output or [])}:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {"Content-Encoding": "gzip"} if file_name.endswith(".gz") else None
+    return FileResponse(os.path.join(export_dir(job_id), file_name), media_type=NDJSON_CONTENT_TYPE, headers=headers)
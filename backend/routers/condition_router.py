@@ -1,60 +1,145 @@
-from fastapi import APIRouter, HTTPException, Depends
+import logging
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request, Header, Query
+from fastapi.responses import ORJSONResponse
 from db.database import get_db
+from db.writer import write_queue
+from sqlalchemy import Column, MetaData, String, Table, delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from models import audit_logging
+from sqlalchemy.exc import IntegrityError
+from models.idempotency import IdempotencyRecord
+from models.audit_logging import Condition
 from schemas import schema
-from core.utils import ensure_fhir_bundle
+from core.utils import ensure_fhir_bundle, content_hash
 from core.auth import get_current_user
+from core.ingest import store_conditions
+from core.fhir import build_condition, build_transaction_bundle, build_operation_outcome
+from core.condition_validation import validate_conditions
+from core.icd_graph import get_graph, find_node
 
 router = APIRouter(tags=["Conditions"])
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_CONDITIONS = 1000
+# subtrees up to this many codes are filtered with IN (...); larger ones (chapters) go through a temporary table
+SUBTREE_IN_MAX_CODES = 500
+
+subtree_codes = Table("subtree_codes", MetaData(), Column("code", String, primary_key=True), prefixes=["TEMPORARY"])
 
 @router.post("/generate-fhir-condition")
-def generate_fhir_condition(request_body: schema.ConditionCreate, actor: str | None = "system", _user=Depends(get_current_user)):
-    fhir_condition = {
-        "resourceType": "Condition",
-        "clinicalStatus": {"coding":[{"system":"http://terminology.hl7.org/CodeSystem/condition-clinical","code":"active","display":"Active"}]},
-        "verificationStatus": {"coding":[{"system":"http://terminology.hl7.org/CodeSystem/condition-ver-status","code":"confirmed","display":"Confirmed"}]},
-        "code": {
-            "text": f"{request_body.namaste_display or ''} / {request_body.icd_display or ''}",
-            "coding": [
-                {"system":"http://ayush.gov.in/namaste","code": request_body.namaste_code, "display": request_body.namaste_display},
-                {"system":"http://id.who.int/icd/release/11/mms","code": request_body.icd_code, "display": request_body.icd_display}
-            ]
-        },
-        "subject": {"reference": f"Patient/{request_body.patient_id}", "display": f"Patient {request_body.patient_id}"}
+def generate_fhir_condition(request_body: schema.ConditionCreate, request: Request, actor: str | None = "system", _user=Depends(get_current_user)):
+    terminology = request.app.state.terminology
+    # returned as a Response so FastAPI skips jsonable_encoder and orjson encodes the dict directly
+    return ORJSONResponse(build_condition(
+        request_body.patient_id,
+        **terminology.enrich(request_body.namaste_code, request_body.namaste_display, request_body.icd_code, request_body.icd_display)
+    ))
+
+@router.post("/generate-fhir-condition/batch")
+def generate_fhir_condition_batch(request_body: List[schema.ConditionCreate], request: Request, actor: str | None = "system", _user=Depends(get_current_user)):
+    if len(request_body) > MAX_BATCH_CONDITIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_CONDITIONS} conditions per batch")
+    terminology = request.app.state.terminology
+    return ORJSONResponse(build_transaction_bundle([
+        build_condition(c.patient_id, **terminology.enrich(c.namaste_code, c.namaste_display, c.icd_code, c.icd_display))
+        for c in request_body
+    ]))
+
+def _store_bundle(db: Session, entries: list, actor: str | None, idempotency: dict | None, outcome: dict | None) -> tuple[dict, list]:
+    """Runs on the writer: dedup check, inserts and the idempotency record in one transaction"""
+    new_conditions, duplicates = store_conditions(db, entries, actor)
+    response = {
+        "stored": [{"id": c.id, "patient_id": c.patient_id} for c in new_conditions],
+        "duplicates": duplicates,
     }
-    return fhir_condition
+    if outcome:
+        response["outcome"] = outcome
+    if idempotency:
+        db.add(IdempotencyRecord(**idempotency, response=response))
+    return response, new_conditions
 
 @router.post("/bundle-upload")
-def upload_bundle(bundle: dict, db: Session = Depends(get_db), actor: str | None = "system", _user=Depends(get_current_user)):
+async def upload_bundle(
+    bundle: dict,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    actor: str | None = "system",
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    _user=Depends(get_current_user)
+):
     # Basic validation
     try:
         ensure_fhir_bundle(bundle)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # process Condition entries and store
-    entries = bundle.get("entry", []) or []
-    stored = []
-    for ent in entries:
-        res = ent.get("resource", {})
-        if res.get("resourceType") == "Condition":
-            c = audit_logging.Condition(
-                patient_id = res.get("subject", {}).get("reference", "").split("/")[-1] or "unknown",
-                namaste_code = next((cd.get("code") for cd in res.get("code", {}).get("coding", []) if "ayush" in (cd.get("system") or "")), None),
-                namaste_display = next((cd.get("display") for cd in res.get("code", {}).get("coding", []) if "ayush" in (cd.get("system") or "")), None),
-                icd_code = next((cd.get("code") for cd in res.get("code", {}).get("coding", []) if "who.int" in (cd.get("system") or "")), None),
-                icd_display = next((cd.get("display") for cd in res.get("code", {}).get("coding", []) if "who.int" in (cd.get("system") or "")), None),
-                source = "bundle-upload",
-                created_by = actor,
-                raw_fhir = res
-            )
-            db.add(c)
-            db.commit()
-            db.refresh(c)
-            stored.append({"id": c.id, "patient_id": c.patient_id})
-            # audit
-            db.add(audit_logging.AuditLog(actor=actor, action="bundle-condition-store", resource=c.id, details={"patient": c.patient_id}))
-            db.commit()
-    print(f"INFO: Successfully processed bundle. Stored {len(stored)} Condition(s).")
-    return {"stored": stored}
+    # replay the stored response for a retried request
+    request_hash = content_hash(bundle)
+    if idempotency_key:
+        prior = await db.get(IdempotencyRecord, (_user.username, idempotency_key))
+        if prior:
+            if prior.request_hash != request_hash:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different bundle")
+            return prior.response
+
+    # validate Condition entries (other resource types are ignored); invalid ones are reported, not stored
+    conditions = [
+        (i, ent["resource"]) for i, ent in enumerate(bundle.get("entry") or [])
+        if isinstance(ent, dict) and isinstance(ent.get("resource"), dict) and ent["resource"].get("resourceType") == "Condition"
+    ]
+    terminology = request.app.state.terminology
+    checked, issues = await validate_conditions(conditions, terminology.snapshot, request.app.state.icd_graph)
+    outcome = build_operation_outcome(issues) if issues else None
+    if outcome and not checked:
+        return ORJSONResponse(outcome, status_code=422)
+
+    # store the valid ones, skipping resources already stored
+    resources = dict(conditions)
+    entries = [(digest, resources[i], fields) for i, digest, fields in checked]
+    idempotency = {"actor": _user.username, "key": idempotency_key, "request_hash": request_hash} if idempotency_key else None
+    try:
+        response, new_conditions = await write_queue.run_async(_store_bundle, entries, actor, idempotency, outcome)
+    except IntegrityError:
+        # a concurrent upload stored the same resources (or used the same key) first
+        raise HTTPException(status_code=409, detail="Concurrent upload of the same bundle, retry the request")
+
+    # only once committed: a rolled-back upload that the client retries must not be counted twice
+    for c in new_conditions:
+        terminology.add_mapping(c.namaste_code, c.icd_code, c.icd_display)
+
+    logger.info("Processed bundle", extra={"stored": len(response["stored"]), "duplicates": response["duplicates"], "invalid": len(issues)})
+    return response
+
+async def _icd_stem_filter(db: AsyncSession, codes: list[str]):
+    if len(codes) <= SUBTREE_IN_MAX_CODES:
+        return Condition.icd_stem.in_(codes)
+    # one row per code through executemany rather than thousands of bound parameters in one statement.
+    # The table lives as long as the pooled connection and keeps its rows across transactions (no
+    # ON COMMIT DELETE ROWS), so the delete below is what clears the previous request's codes.
+    await db.execute(text("CREATE TEMPORARY TABLE IF NOT EXISTS subtree_codes (code VARCHAR PRIMARY KEY)"))
+    await db.execute(delete(subtree_codes))
+    await db.execute(insert(subtree_codes), [{"code": code} for code in dict.fromkeys(codes)])
+    return Condition.icd_stem.in_(select(subtree_codes.c.code))
+
+@router.get("/conditions", response_model=List[schema.ConditionOut])
+async def list_conditions(
+    request: Request,
+    patient_id: str | None = None,
+    icd_subtree: str | None = Query(None, description="ICD-11 code, block or chapter; matches it and every code beneath it"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    _user=Depends(get_current_user)
+):
+    query = select(Condition)
+    if patient_id:
+        query = query.where(Condition.patient_id == patient_id)
+    if icd_subtree:
+        # expand the subtree locally, then match stems so postcoordinated codes (1A00&XN...) are included
+        graph = get_graph(request)
+        codes = graph.subtree_codes(find_node(graph, icd_subtree))
+        if not codes:
+            return []
+        query = query.where(await _icd_stem_filter(db, codes))
+    return (await db.scalars(query.order_by(Condition.created_at.desc()).offset(skip).limit(limit))).all()
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+
+from core.auth import get_current_user
+from core.icd_graph import IcdGraph, get_graph, find_node
+
+router = APIRouter(tags=["ICD-11 Hierarchy"])
+
+
+@router.get("/icd/{code}/ancestors")
+def get_ancestors(code: str, graph: IcdGraph = Depends(get_graph), _user=Depends(get_current_user)):
+    """Ancestors of a code, nearest parent first, up to its chapter"""
+    i = find_node(graph, code)
+    return ORJSONResponse({"code": code, "ancestors": [graph.node(a) for a in graph.ancestors(i)]})
+
+
+@router.get("/icd/{code}/descendants")
+def get_descendants(
+    code: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    graph: IcdGraph = Depends(get_graph),
+    _user=Depends(get_current_user)
+):
+    """All descendants of a code in preorder (the subtree is one contiguous range, so paging is a slice)"""
+    i = find_node(graph, code)
+    descendants = graph.descendants(i)
+    return ORJSONResponse({
+        "code": code,
+        "total": len(descendants),
+        "descendants": [graph.node(d) for d in descendants[skip:skip + limit]],
+    })
+
+
+@router.get("/icd/{code}/is-a/{ancestor}")
+def get_is_a(code: str, ancestor: str, graph: IcdGraph = Depends(get_graph), _user=Depends(get_current_user)):
+    """Whether `code` is `ancestor` or lies anywhere beneath it"""
+    return ORJSONResponse({
+        "code": code,
+        "ancestor": ancestor,
+        "is_a": graph.is_a(find_node(graph, code), find_node(graph, ancestor)),
+    })
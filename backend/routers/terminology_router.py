@@ -1,33 +1,111 @@
-from fastapi import APIRouter, Request, HTTPException, Depends, Query
+import asyncio
+import time
+
+import orjson
+from fastapi import APIRouter, Request, Response, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from core.utils import strip_html, normalize_term, call_who_icd
-from core.icd_client import fetch_entity, search_icd, get_icd_entity
-from db.database import get_db
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from core.utils import strip_html, normalize_term, search_who_cached
+from core.resilience import UpstreamUnavailable, RateLimited
+from core.icd_client import fetch_entity, search_icd, get_icd_entity, resolve_stem_codes
+from db.writer import write_queue
 from models import audit_logging
-from core.auth import get_current_user
+from core.auth import get_current_user, user_from_token, decode_access_token
+from core.autocomplete import AutocompleteSession
+from db.database import AsyncSessionLocal
+from core.ratelimit import rate_limited
+from core.http_cache import conditional
+from core.config import settings
 
 router = APIRouter(tags=["Terminology"])
 
+# WHO-backed endpoints share one per-user bucket
+who_rate_limit = rate_limited("who", settings.RATE_LIMIT_WHO_PER_MINUTE, settings.RATE_LIMIT_WHO_BURST)
+
 # AUTOCOMPLETE
 @router.get("/autocomplete-namaste")
 def autocomplete_namaste_term(
     term: str,
     request: Request,
+    response: Response,
     limit: int = 10,
     _user=Depends(get_current_user) # _user for unused just for authentication
 ):
-    namaste_data = request.app.state.namaste_data
-    if not namaste_data:
+    terminology = request.app.state.terminology
+    if not len(terminology):
         raise HTTPException(status_code=500, detail="NAMASTE data not loaded")
     q = normalize_term(term)
-    results = []
-    for item in namaste_data:
-        if q in item.get("Traditional_Term", "").lower() or q in item.get("Biomedical_Term", "").lower() or q in item.get("System", "").lower():
-            results.append(item)
-            if len(results) >= limit:
+    not_modified = conditional(request, response, terminology.version, "autocomplete", q, limit)
+    if not_modified:
+        return not_modified
+    return {"results": terminology.search(q, limit)}
+
+
+@router.websocket("/ws/autocomplete-namaste")
+async def autocomplete_namaste_ws(websocket: WebSocket):
+    """
+    Autocomplete session. The first message is {"token": "<JWT>"}; once the
+    server answers {"type": "ready"}, send {"q": ..., "limit": 10, "id": n} per
+    keystroke and receive {"id": n, "q": ..., "results": [...]}. Queries
+    superseded within the debounce window are dropped without a reply, and a
+    query extending the previous one narrows its matches instead of rescanning.
+    """
+    await websocket.accept()
+    try:
+        token = orjson.loads(await asyncio.wait_for(websocket.receive_text(), settings.AUTOCOMPLETE_WS_AUTH_TIMEOUT)).get("token")
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, ValueError, AttributeError):
+        token = None
+    async with AsyncSessionLocal() as db:
+        user = await user_from_token(token, db) if isinstance(token, str) else None
+    if user is None:
+        await websocket.close(code=1008, reason="Could not validate credentials")
+        return
+    expires_at = decode_access_token(token).get("exp") or float("inf")
+
+    session = AutocompleteSession(websocket.app.state.terminology.snapshot)
+    await websocket.send_text('{"type":"ready"}')
+
+    latest = None
+    arrived = asyncio.Event()
+
+    async def read():
+        nonlocal latest
+        while True:
+            latest = await websocket.receive_text()
+            arrived.set()
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            waiter = asyncio.create_task(arrived.wait())
+            done, _ = await asyncio.wait({reader, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if reader in done:
+                waiter.cancel()
+                break  # client went away
+            # keystrokes landing in the debounce window replace `latest`; only the last one is answered
+            await asyncio.sleep(settings.AUTOCOMPLETE_WS_DEBOUNCE_MS / 1000)
+            arrived.clear()
+            if time.time() >= expires_at:
+                await websocket.close(code=1008, reason="Token expired")
                 break
-    return {"results": results}
+            try:
+                message = orjson.loads(latest)
+                q = message["q"]
+                limit = min(max(int(message.get("limit", 10)), 1), 100)
+                if not isinstance(q, str):
+                    raise TypeError
+            except (ValueError, TypeError, KeyError, AttributeError):
+                await websocket.send_text(orjson.dumps({"error": "Expected a JSON object with a string 'q'"}).decode())
+                continue
+            reply = {"id": message.get("id"), "q": q, "results": session.query(q, limit)}
+            await websocket.send_text(orjson.dumps(reply).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
 
 
 class TranslateRequest(BaseModel):
@@ -36,27 +114,28 @@ class TranslateRequest(BaseModel):
 
 
 @router.post("/translate/namaste-to-icd")
-def translate_namaste(
+async def translate_namaste(
     req: TranslateRequest,
     request: Request,
-    db: Session = Depends(get_db),
     actor: str | None = "system",
-    _user=Depends(get_current_user)
+    resolve_codes: bool = False,
+    _user=Depends(who_rate_limit)
 ):
     # log audit
-    db.add(audit_logging.AuditLog(
+    await write_queue.add_async(audit_logging.AuditLog(
         actor=actor,
         action="translate",
         resource=req.namaste_code,
         details={"display": req.namaste_display or ""}
     ))
-    db.commit()
 
     search_term = req.namaste_display or req.namaste_code
-    uri = f"https://id.who.int/icd/entity/search?q={search_term}&flatResults=true&highlighting=false&useFlexisearch=true"
+    uri = f"{settings.WHO_API_BASE}/entity/search?q={search_term}&flatResults=true&highlighting=false&useFlexisearch=true"
 
     try:
-        search_res = call_who_icd(uri)
+        search_res = await run_in_threadpool(search_who_cached, uri)
+    except (UpstreamUnavailable, RateLimited):
+        raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"WHO search failed: {e}")
 
@@ -72,21 +151,78 @@ def translate_namaste(
             "display": title
         })
 
+    # stem codes for all candidates in one parallel round (cached hierarchy afterwards)
+    if resolve_codes and matches:
+        for match, code in zip(matches, await run_in_threadpool(resolve_stem_codes, destination)):
+            match["icd11_code"] = code
+
     return {
         "namaste_code": req.namaste_code,
         "candidates": matches
     }
 
+class ReverseTranslateRequest(BaseModel):
+    icd_code: str | None = None
+    icd_display: str | None = None
+
+
+MAX_BATCH_REVERSE = 1000
+
+
+def _reverse_one(request: Request, req: ReverseTranslateRequest, limit: int) -> dict:
+    terminology = request.app.state.terminology
+    display = req.icd_display
+    if not display and req.icd_code:
+        # learned display first, then the title in the local ICD-11 hierarchy
+        display = terminology.icd_displays.get(req.icd_code)
+        graph = request.app.state.icd_graph
+        i = graph.find(req.icd_code) if not display else None
+        if i is not None:
+            display = graph.titles[i]
+    return {
+        "icd_code": req.icd_code,
+        "icd_display": display,
+        "candidates": terminology.reverse(req.icd_code, display, limit),
+    }
+
+
+@router.post("/translate/icd-to-namaste")
+def translate_icd(req: ReverseTranslateRequest, request: Request, limit: int = Query(10, ge=1, le=100), _user=Depends(get_current_user)):
+    """
+    NAMASTE candidates for an ICD-11 code and/or display, served from memory
+    (stored mappings, then Biomedical_Term matches) without calling WHO
+    """
+    if not req.icd_code and not req.icd_display:
+        raise HTTPException(status_code=422, detail="icd_code or icd_display is required")
+    return ORJSONResponse(_reverse_one(request, req, limit))
+
+
+@router.post("/translate/icd-to-namaste/batch")
+def translate_icd_batch(reqs: list[ReverseTranslateRequest], request: Request, limit: int = Query(10, ge=1, le=100), _user=Depends(get_current_user)):
+    if len(reqs) > MAX_BATCH_REVERSE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_REVERSE} lookups per batch")
+    return ORJSONResponse({"results": [_reverse_one(request, req, limit) for req in reqs]})
+
+
 @router.get("/search/{diagnosis}")
-def search_icd_code(diagnosis: str):
+def search_icd_code(diagnosis: str, request: Request, response: Response, _user=Depends(who_rate_limit)):
     """
     Search ICD-11 codes by diagnosis name
     """
-    results = search_icd(diagnosis)
+    not_modified = conditional(request, response, settings.ICD_RELEASE_VERSION, "search", diagnosis)
+    if not_modified:
+        return not_modified
+    try:
+        results = search_icd(diagnosis)
+    except (UpstreamUnavailable, RateLimited):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHO search failed: {e}")
     destination_entities = results.get("destinationEntities", [])
     formatted_results = []
 
-    for item in destination_entities:
+    codes = resolve_stem_codes(destination_entities) if destination_entities else []
+    for item, code in zip(destination_entities, codes):
         id_val = item.get("id")
 
         # Handle both dict and string cases for title
@@ -98,16 +234,27 @@ def search_icd_code(diagnosis: str):
 
         formatted_results.append({
             "id": id_val,
-            "title": title_val
+            "title": title_val,
+            "code": code
         })
 
     return {"query": diagnosis, "results": formatted_results}
 
 
 @router.get("/entity/{entity_id}")
-def get_icd_entity_details(entity_id: str):
+def get_icd_entity_details(entity_id: str, request: Request, response: Response, _user=Depends(who_rate_limit)):
     """
     Get ICD-11 entity details by numeric ID (e.g., 2020851679)
     """
-    return get_icd_entity(entity_id)
+    not_modified = conditional(request, response, settings.ICD_RELEASE_VERSION, "entity", entity_id)
+    if not_modified:
+        return not_modified
+    try:
+        return get_icd_entity(entity_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (UpstreamUnavailable, RateLimited):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"WHO entity lookup failed: {e}")
 
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+import json
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List
 from datetime import datetime
 
 class NamasteJobCreate(BaseModel):
@@ -9,6 +10,7 @@ class NamasteJobCreate(BaseModel):
 class NamasteJobStatus(BaseModel):
     job_id: str
     status: str
+    result: Optional[List[dict]] = None
     prompt: Optional[str] = None
     error: Optional[str] = None
     created_at: datetime
@@ -16,3 +18,19 @@ class NamasteJobStatus(BaseModel):
 
     class Config:
         from_attributes = True   # ✅ Pydantic v2 fix
+
+    @model_validator(mode="after")
+    def _prompt_from_result(self):
+        # clients written before `result` existed parse the diagnoses out of `prompt`
+        if self.prompt is None and self.result is not None:
+            self.prompt = json.dumps(self.result)
+        return self
+
+
+class NamasteJobStatusQuery(BaseModel):
+    job_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
+class NamasteJobStatusBatch(BaseModel):
+    jobs: List[NamasteJobStatus]
+    missing: List[str]  # ids with no job (never created, or already purged)
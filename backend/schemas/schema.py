@@ -25,10 +25,11 @@ class UserPublic(BaseModel):
 
 class ConditionCreate(BaseModel):
     patient_id: str
-    namaste_code: Optional[str]
-    namaste_display: Optional[str]
-    icd_code: Optional[str]
-    icd_display: Optional[str]
+    # anything left out is resolved from the loaded terminology
+    namaste_code: Optional[str] = None
+    namaste_display: Optional[str] = None
+    icd_code: Optional[str] = None
+    icd_display: Optional[str] = None
 
 class ConditionOut(ConditionCreate):
     id: str
@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / "data"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# settings are read on import, so the environment is fixed before any app module loads
+_tmp = tempfile.mkdtemp(prefix="namaste-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_tmp}/app.db",
+    "ASYNC_DATABASE_URL": "",
+    "ICD_SNAPSHOT_PATH": str(DATA_DIR / "icd11_mms_tabulation.txt"),
+    "NAMASTE_SNAPSHOT_PATH": f"{_tmp}/namaste.snap",
+    "CACHE_BACKEND": "memory",
+    "JOB_RETENTION_DAYS": "0",
+    "TRACE_EXPORT_PATH": "",
+})
+for name in ("SECRET_KEY", "JWT_SECRET", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def api(client):
+    from core.config import settings
+
+    return settings.API_PREFIX
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client, api):
+    client.post(f"{api}/register", json={"username": "tester", "password": "pw123456"})
+    token = client.post(f"{api}/token", data={"username": "tester", "password": "pw123456"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
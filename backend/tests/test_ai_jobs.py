@@ -0,0 +1,23 @@
+import uuid
+
+from core import ai_response
+from db.database import engine
+from db.writer import write_queue
+from models.job import NamasteJob
+
+
+def test_job_holds_no_connection_while_waiting_on_model(client, monkeypatch):
+    job_id = str(uuid.uuid4())
+    write_queue.run(lambda db: db.add(NamasteJob(job_id=job_id, status="pending")))
+    checked_out = []
+
+    def ask_model(job_id, text):
+        checked_out.append(engine.pool.checkedout())
+        return [], "[]"
+
+    monkeypatch.setattr(ai_response.ai_cache, "get", lambda key: None)
+    monkeypatch.setattr(ai_response.NamasteAiResponse, "_ask_model", classmethod(lambda cls, *args: ask_model(*args)))
+
+    ai_response.NamasteAiResponse.run(job_id, f"symptoms {job_id}")
+
+    assert checked_out == [0]
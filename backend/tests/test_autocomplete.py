@@ -0,0 +1,18 @@
+from core.autocomplete import AutocompleteSession
+from core.namaste_snapshot import NamasteSnapshot, build
+from core.utils import normalize_term
+
+ROWS = [
+    {"NAMASTE_Code": f"AY-{n:03d}", "Traditional_Term": term, "Biomedical_Term": bio, "System": "Ayurveda"}
+    for n, (term, bio) in enumerate([("Madhumeha", "Diabetes"), ("Madhura", "Sweet"), ("Jvara", "Fever"),
+                                     ("Amlapitta", "Acidity"), ("Jvaratisara", "Enteric fever")] * 40)
+]
+
+
+def test_session_answers_like_a_fresh_search():
+    snapshot = NamasteSnapshot(build(ROWS, "0" * 16))
+    session = AutocompleteSession(snapshot)
+    keystrokes = ["m", "ma", "mad", "madh", "madhu", "madhum", "madh", "jva", "jvar", "jvara", "jvarat", "fever", "feverx", ""]
+    for term in keystrokes:
+        expected = [snapshot.row(i) for i in snapshot.search(normalize_term(term), 10)]
+        assert session.query(term, 10) == expected, term
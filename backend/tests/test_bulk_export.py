@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from core import bulk_export
+from db.database import SessionLocal, engine
+from db.writer import write_queue
+from models.audit_logging import Condition
+from models.job import BulkExportJob
+
+
+def test_export_holds_no_connection_while_waiting_on_writer(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_export.settings, "EXPORT_DIR", str(tmp_path))
+    job_id = str(uuid.uuid4())
+    write_queue.run(lambda db: db.add(BulkExportJob(
+        job_id=job_id, status="pending", request_url="http://test/$export", resource_type="Condition",
+        transaction_time=datetime.utcnow(),
+    )))
+    checked_out = []
+    run = write_queue.run
+
+    def tracking_run(fn, *args, **kwargs):
+        checked_out.append(engine.pool.checkedout())
+        return run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(bulk_export.write_queue, "run", tracking_run)
+
+    bulk_export.run_bulk_export(job_id)
+
+    assert checked_out == [0, 0]  # "processing", then "completed"
+    db = SessionLocal()
+    try:
+        assert db.query(BulkExportJob.status).filter(BulkExportJob.job_id == job_id).scalar() == "completed"
+    finally:
+        db.close()
+
+
+def _exported_ids(client, api, auth_headers, since: str) -> set:
+    res = client.get(f"{api}/$export", params={"_since": since}, headers=auth_headers)
+    assert res.status_code == 202
+    manifest = client.get(res.headers["Content-Location"], headers=auth_headers).json()
+    ids = set()
+    for output in manifest["output"]:
+        lines = client.get(output["url"], headers=auth_headers).text.splitlines()
+        ids.update(orjson.loads(line)["id"] for line in lines)
+    return ids
+
+
+def test_since_with_offset_is_converted_to_utc(client, api, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_export.settings, "EXPORT_DIR", str(tmp_path))
+    created_at = datetime.utcnow() - timedelta(hours=2)
+    condition_id = str(uuid.uuid4())
+    write_queue.run(lambda db: db.add(Condition(
+        id=condition_id, patient_id="since-test", created_at=created_at,
+        raw_fhir={"resourceType": "Condition", "id": condition_id},
+    )))
+    ist = timezone(timedelta(hours=5, minutes=30))
+
+    before = (created_at - timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(ist)
+    after = (created_at + timedelta(hours=1)).replace(tzinfo=timezone.utc).astimezone(ist)
+
+    assert condition_id in _exported_ids(client, api, auth_headers, before.isoformat())
+    assert condition_id not in _exported_ids(client, api, auth_headers, after.isoformat())
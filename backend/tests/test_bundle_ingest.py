@@ -0,0 +1,109 @@
+import uuid
+
+
+def condition(patient: str, namaste_code: str = "AY-EC-03", icd_code: str = "1A00") -> dict:
+    return {
+        "resourceType": "Condition",
+        "subject": {"reference": f"Patient/{patient}"},
+        "code": {"coding": [
+            {"system": "https://ayush.gov.in/fhir/namaste", "code": namaste_code},
+            {"system": "http://id.who.int/icd/release/11/mms", "code": icd_code},
+        ]},
+    }
+
+
+def bundle(*resources) -> dict:
+    return {"resourceType": "Bundle", "type": "collection", "entry": [{"resource": r} for r in resources]}
+
+
+def new_patient() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def upload(client, api, headers, body, key=None):
+    extra = {"Idempotency-Key": key} if key else {}
+    return client.post(f"{api}/bundle-upload", json=body, headers={**headers, **extra})
+
+
+def test_stores_new_conditions(client, api, auth_headers):
+    res = upload(client, api, auth_headers, bundle(condition(new_patient()), condition(new_patient())))
+    assert res.status_code == 200
+    assert len(res.json()["stored"]) == 2
+    assert res.json()["duplicates"] == 0
+
+
+def test_duplicates_within_a_bundle_are_stored_once(client, api, auth_headers):
+    same = condition(new_patient())
+    res = upload(client, api, auth_headers, bundle(same, dict(same), condition(new_patient())))
+    assert len(res.json()["stored"]) == 2
+    assert res.json()["duplicates"] == 1
+
+
+def test_duplicates_of_stored_conditions_are_skipped(client, api, auth_headers):
+    first = condition(new_patient())
+    upload(client, api, auth_headers, bundle(first))
+    res = upload(client, api, auth_headers, bundle(first, condition(new_patient())))
+    assert len(res.json()["stored"]) == 1
+    assert res.json()["duplicates"] == 1
+
+
+def test_idempotency_key_replays_the_first_response(client, api, auth_headers):
+    key = uuid.uuid4().hex
+    body = bundle(condition(new_patient()))
+    first = upload(client, api, auth_headers, body, key)
+    replay = upload(client, api, auth_headers, body, key)
+    assert first.status_code == replay.status_code == 200
+    assert replay.json() == first.json()
+    assert len(replay.json()["stored"]) == 1  # not reported as a duplicate on replay
+
+
+def test_idempotency_key_reused_with_another_bundle_is_rejected(client, api, auth_headers):
+    key = uuid.uuid4().hex
+    upload(client, api, auth_headers, bundle(condition(new_patient())), key)
+    res = upload(client, api, auth_headers, bundle(condition(new_patient())), key)
+    assert res.status_code == 422
+
+
+def test_concurrent_duplicate_upload_returns_409(client, api, auth_headers, monkeypatch):
+    body = bundle(condition(new_patient()))
+    upload(client, api, auth_headers, body)
+
+    # the other upload committed between our existence check and our insert
+    monkeypatch.setattr("core.ingest.existing_hashes", lambda db, digests: set())
+    res = upload(client, api, auth_headers, body)
+    assert res.status_code == 409
+
+
+def test_invalid_conditions_only_returns_operation_outcome(client, api, auth_headers):
+    res = upload(client, api, auth_headers, bundle(condition(new_patient(), namaste_code="NOPE")))
+    assert res.status_code == 422
+    assert res.json()["resourceType"] == "OperationOutcome"
+
+
+def test_icd_subtree_matches_postcoordinated_codes(client, api, auth_headers):
+    patient = new_patient()
+    upload(client, api, auth_headers, bundle(condition(patient, icd_code="1A00.0&2A00"), condition(patient, icd_code="2A00")))
+    res = client.get(f"{api}/conditions", params={"patient_id": patient, "icd_subtree": "1A00"}, headers=auth_headers)
+    assert [c["icd_code"] for c in res.json()] == ["1A00.0&2A00"]
+
+
+def test_large_icd_subtree_goes_through_a_temporary_table(client, api, auth_headers, monkeypatch):
+    monkeypatch.setattr("routers.condition_router.SUBTREE_IN_MAX_CODES", 1)
+    patient = new_patient()
+    upload(client, api, auth_headers, bundle(condition(patient, icd_code="1A01"), condition(patient, icd_code="2A00")))
+    for _ in range(2):  # the temporary table is reused on the same connection
+        res = client.get(f"{api}/conditions", params={"patient_id": patient, "icd_subtree": "01"}, headers=auth_headers)
+        assert [c["icd_code"] for c in res.json()] == ["1A01"]
+
+
+def test_concept_map_counts_only_committed_uploads(client, api, auth_headers, monkeypatch):
+    reverse_map = client.app.state.terminology.reverse_map
+    before = reverse_map.get("1A01", {}).get("AY-EF-02", 0)
+    body = bundle(condition(new_patient(), namaste_code="AY-EF-02", icd_code="1A01"))
+    upload(client, api, auth_headers, body)
+    assert reverse_map["1A01"]["AY-EF-02"] == before + 1
+
+    # a rolled-back retry (409) leaves the counts alone
+    monkeypatch.setattr("core.ingest.existing_hashes", lambda db, digests: set())
+    assert upload(client, api, auth_headers, body).status_code == 409
+    assert reverse_map["1A01"]["AY-EF-02"] == before + 1
@@ -0,0 +1,17 @@
+def namaste_coding(client, api, auth_headers, **fields):
+    res = client.post(f"{api}/generate-fhir-condition", json={"patient_id": "p1", **fields}, headers=auth_headers)
+    assert res.status_code == 200
+    return res.json()["code"]["coding"][0]
+
+
+def test_display_fills_code_and_system(client, api, auth_headers):
+    coding = namaste_coding(client, api, auth_headers, namaste_display="Jvara")
+    assert coding["code"] == "AY-EC-03"
+    assert coding["extension"][0]["valueString"] == "Ayurveda"
+
+
+def test_display_of_another_concept_does_not_enrich_an_unknown_code(client, api, auth_headers):
+    coding = namaste_coding(client, api, auth_headers, namaste_code="XX-99", namaste_display="Jvara")
+    assert coding["code"] == "XX-99"
+    assert coding["display"] == "Jvara"
+    assert "extension" not in coding
@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import os
+import uuid
+
+import orjson
+
+from core import bulk_export
+from core.compression import CompressionMiddleware, choose_encoding
+from core.http_cache import matching_etag
+from db.writer import write_queue
+from models.audit_logging import Condition
+
+
+def test_choose_encoding_respects_q_zero():
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("*;q=0") is None
+    assert choose_encoding("identity") is None
+
+
+def test_matching_etag_accepts_compressed_and_weak_tags():
+    assert matching_etag('"abc-gzip"', '"abc"') == '"abc-gzip"'
+    assert matching_etag('W/"abc-br", "other"', '"abc"') == 'W/"abc-br"'
+    assert matching_etag("*", '"abc"') == '"abc"'
+    assert matching_etag('"abd-gzip"', '"abc"') is None
+    assert matching_etag(None, '"abc"') is None
+
+
+def autocomplete(client, api, auth_headers, **headers):
+    return client.get(f"{api}/autocomplete-namaste", params={"term": "a", "limit": 50},
+                      headers={**auth_headers, **headers})
+
+
+def test_compressed_response_gets_suffixed_etag_and_revalidates(client, api, auth_headers):
+    res = autocomplete(client, api, auth_headers, **{"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    etag = res.headers["etag"]
+    assert etag.endswith('-gzip"')
+    assert "Accept-Encoding" in res.headers["vary"]
+
+    again = autocomplete(client, api, auth_headers, **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    # the identity copy's validator names the same data
+    identity = autocomplete(client, api, auth_headers, **{"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert identity.status_code == 304
+
+
+def test_q_zero_gets_identity(client, api, auth_headers):
+    res = autocomplete(client, api, auth_headers, **{"Accept-Encoding": "gzip;q=0"})
+    assert res.status_code == 200
+    assert "content-encoding" not in res.headers
+    assert not res.headers["etag"].endswith('-gzip"')
+
+
+def test_gzip_export_download_is_not_compressed_twice(client, api, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_export.settings, "EXPORT_DIR", str(tmp_path))
+    condition_id = str(uuid.uuid4())
+    write_queue.run(lambda db: db.add(Condition(
+        id=condition_id, patient_id="gzip-test",
+        # random text keeps the gzip file above the middleware's minimum size, so size alone does not exempt it
+        raw_fhir={"resourceType": "Condition", "id": condition_id, "note": [{"text": os.urandom(2048).hex()}]},
+    )))
+    kickoff = client.get(f"{api}/$export", params={"compress": "true"}, headers=auth_headers)
+    manifest = client.get(kickoff.headers["Content-Location"], headers=auth_headers).json()
+    url = manifest["output"][0]["url"]
+    assert url.endswith(".ndjson.gz")
+
+    res = client.get(url, headers={**auth_headers, "Accept-Encoding": "gzip"})
+
+    assert res.headers["content-encoding"] == "gzip"
+    # a single layer of gzip, which the client has decoded
+    assert condition_id in {orjson.loads(line)["id"] for line in res.content.splitlines()}
+
+
+def test_middleware_leaves_encoded_bodies_alone():
+    body = gzip.compress(os.urandom(4096))
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-encoding", b"gzip"),
+            (b"content-length", str(len(body)).encode()), (b"etag", b'"abc"'),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip, br")]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=0)(scope, None, send))
+
+    assert dict(sent[0]["headers"])[b"content-encoding"] == b"gzip"
+    assert dict(sent[0]["headers"])[b"etag"] == b'"abc"'
+    assert sent[1]["body"] == body
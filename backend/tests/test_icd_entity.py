@@ -0,0 +1,73 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from core import icd_client
+from core.resilience import RateLimited, UpstreamUnavailable
+
+
+def who_returns(monkeypatch, payloads: dict):
+    """Stand-in for WHO: entity id -> JSON payload, HTTP status code or exception"""
+    def fake_request(endpoint, method, url, **kwargs):
+        outcome = payloads[url.rsplit("/", 1)[-1]]
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            def raise_for_status():
+                raise requests.HTTPError(f"{outcome}", response=SimpleNamespace(status_code=outcome))
+            return SimpleNamespace(status_code=outcome, raise_for_status=raise_for_status)
+        return SimpleNamespace(status_code=200, raise_for_status=lambda: None, json=lambda: outcome)
+
+    monkeypatch.setattr(icd_client, "get_headers", lambda: {})
+    monkeypatch.setattr(icd_client, "who_request", fake_request)
+
+
+def entity_id() -> str:
+    return str(uuid.uuid4().int)[:10]  # fresh id, so the hierarchy cache never answers
+
+
+def test_entity_keeps_chapter_code(client, api, auth_headers, monkeypatch):
+    chapter = entity_id()
+    who_returns(monkeypatch, {chapter: {"code": "01", "title": {"@value": "Certain infectious diseases"}}})
+
+    res = client.get(f"{api}/entity/{chapter}", headers=auth_headers)
+
+    assert res.status_code == 200
+    assert res.json() == {"id": chapter, "name": "Certain infectious diseases", "code": "01"}
+
+
+@pytest.mark.parametrize("outcome, status", [
+    (404, 404),
+    (500, 502),
+    (UpstreamUnavailable("who_icd", 30), 503),
+    (RateLimited("who_icd is at capacity, retry shortly", 5), 429),
+])
+def test_entity_errors(client, api, auth_headers, monkeypatch, outcome, status):
+    missing = entity_id()
+    who_returns(monkeypatch, {missing: outcome})
+
+    res = client.get(f"{api}/entity/{missing}", headers=auth_headers)
+
+    assert res.status_code == status
+    if status in (429, 503):
+        assert "Retry-After" in res.headers
+
+
+def test_stem_codes_skip_chapter_codes(client, monkeypatch):
+    chapter, category = entity_id(), entity_id()
+    who_returns(monkeypatch, {
+        chapter: {"code": "01", "title": "Chapter", "child": [f"http://id.who.int/icd/entity/{category}"]},
+        category: {"code": "1A00", "title": "Cholera"},
+    })
+
+    assert icd_client.resolve_stem_codes([{"id": f"http://id.who.int/icd/entity/{chapter}"}]) == ["1A00"]
+
+
+def test_stem_codes_raise_when_circuit_is_open(client, monkeypatch):
+    unknown = entity_id()
+    who_returns(monkeypatch, {unknown: UpstreamUnavailable("who_icd", 30)})
+
+    with pytest.raises(UpstreamUnavailable):
+        icd_client.resolve_stem_codes([{"id": f"http://id.who.int/icd/entity/{unknown}"}])
@@ -0,0 +1,59 @@
+import asyncio
+import gzip
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from core import job_reaper
+from db.database import SessionLocal
+from db.writer import write_queue
+from models.job import NamasteJob
+
+
+def add_job(status: str, age_days: int) -> str:
+    job_id = str(uuid.uuid4())
+    write_queue.run(lambda db: db.add(NamasteJob(
+        job_id=job_id, status=status, created_at=datetime.utcnow() - timedelta(days=age_days),
+    )))
+    return job_id
+
+
+def stored(job_ids) -> set:
+    db = SessionLocal()
+    try:
+        return {j for (j,) in db.query(NamasteJob.job_id).filter(NamasteJob.job_id.in_(job_ids))}
+    finally:
+        db.close()
+
+
+def test_reaps_and_archives_old_finished_jobs(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_reaper.settings, "JOB_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(job_reaper.settings, "JOB_REAP_BATCH_SIZE", 2)
+    old = [add_job("completed", 40), add_job("failed", 40), add_job("completed", 40)]
+    keep = [add_job("pending", 40), add_job("completed", 1)]
+
+    removed = asyncio.run(job_reaper.reap_finished_jobs(datetime.utcnow() - timedelta(days=30)))
+
+    assert removed == 3
+    assert stored(old + keep) == set(keep)
+    archived = []
+    for path in tmp_path.iterdir():
+        with gzip.open(path) as f:
+            archived += [orjson.loads(line)["job_id"] for line in f]
+    assert sorted(archived) == sorted(old)
+
+
+def test_archive_failure_keeps_jobs(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_reaper.settings, "JOB_ARCHIVE_DIR", str(tmp_path))
+    job_id = add_job("completed", 40)
+
+    def full_disk(rows):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(job_reaper, "_archive", full_disk)
+    with pytest.raises(OSError):
+        asyncio.run(job_reaper.reap_finished_jobs(datetime.utcnow() - timedelta(days=30)))
+
+    assert stored([job_id]) == {job_id}  # delete rolled back
@@ -0,0 +1,78 @@
+from sqlalchemy import Column, DateTime, Integer, JSON, MetaData, String, Table, Text, create_engine, func, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from core.analytics import backfill_code_usage
+from db.migrate import upgrade_to_head
+
+
+def create_baseline_schema(engine):
+    """What the original create_all() startup built, before migrations existed"""
+    metadata = MetaData()
+    Table("users", metadata,
+          Column("id", String, primary_key=True),
+          Column("username", String, unique=True, index=True, nullable=False),
+          Column("hashed_password", String, nullable=False),
+          Column("full_name", String),
+          Column("created_at", DateTime))
+    Table("audit_logs", metadata,
+          Column("id", String, primary_key=True),
+          Column("actor", String),
+          Column("action", String),
+          Column("resource", String),
+          Column("details", JSON),
+          Column("created_at", DateTime))
+    Table("conditions", metadata,
+          Column("id", String, primary_key=True),
+          Column("patient_id", String, index=True, nullable=False),
+          Column("namaste_code", String),
+          Column("namaste_display", String),
+          Column("icd_code", String),
+          Column("icd_display", String),
+          Column("source", String),
+          Column("created_by", String),
+          Column("created_at", DateTime),
+          Column("raw_fhir", JSON))
+    Table("jobs", metadata,
+          Column("id", Integer, primary_key=True, index=True),
+          Column("job_id", String, unique=True, index=True, nullable=False),
+          Column("prompt", Text),
+          Column("status", String),
+          Column("error", Text),
+          Column("created_at", DateTime(timezone=True), server_default=func.now()),
+          Column("completed_at", DateTime(timezone=True)))
+    metadata.create_all(engine)
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    create_baseline_schema(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO conditions (id, patient_id, namaste_code, icd_code) VALUES ('c1', 'p1', 'AY-EC-03', '1A00')"
+        )
+
+    upgrade_to_head(engine)
+
+    inspector = inspect(engine)
+    assert {"code_usage_stats", "idempotency_keys", "bulk_export_jobs"} <= set(inspector.get_table_names())
+    assert "content_hash" in {c["name"] for c in inspector.get_columns("conditions")}
+    assert {"ix_conditions_content_hash", "ix_conditions_icd_code"} <= {i["name"] for i in inspector.get_indexes("conditions")}
+    assert {"result", "traceparent"} <= {c["name"] for c in inspector.get_columns("jobs")}
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT icd_stem FROM conditions WHERE id = 'c1'").scalar() == "1A00"
+
+    # the startup step that used to fail with "no such table: code_usage_stats"
+    db = sessionmaker(bind=engine)()
+    try:
+        backfill_code_usage(db)
+        assert db.execute(text("SELECT count(*) FROM code_usage_stats")).scalar() > 0
+    finally:
+        db.close()
+
+
+def test_upgrade_is_a_no_op_at_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    upgrade_to_head(engine)
+    tables = set(inspect(engine).get_table_names())
+    upgrade_to_head(engine)
+    assert set(inspect(engine).get_table_names()) == tables
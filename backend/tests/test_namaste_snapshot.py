@@ -0,0 +1,142 @@
+import csv
+import struct
+
+import pytest
+
+from core.namaste_snapshot import FORMAT_VERSION, HEADER, MAGIC, NamasteSnapshot, build, compile_snapshot
+
+ROWS = [
+    {"NAMASTE_Code": "AY-01", "Traditional_Term": "Jvara", "Biomedical_Term": "Fever", "System": "Ayurveda"},
+    {"NAMASTE_Code": "SI-01", "Traditional_Term": "Suram", "Biomedical_Term": "Fever", "System": "Siddha"},
+    {"NAMASTE_Code": "UN-01", "Traditional_Term": " Humma ", "Biomedical_Term": "Pyrexia", "System": "Unani"},
+    {"NAMASTE_Code": "", "Traditional_Term": "Uncoded term", "Biomedical_Term": "Fever", "System": "Ayurveda"},
+    {"NAMASTE_Code": "AY-02", "Traditional_Term": "Madhumeha", "Biomedical_Term": "Diabetes mellitus", "System": "Ayurveda"},
+    {"NAMASTE_Code": "AY-03", "Traditional_Term": "ज्वरातिसार", "Biomedical_Term": "Fièvre entérique", "System": "Ayurveda"},
+]
+
+
+@pytest.fixture
+def snapshot():
+    return NamasteSnapshot(build(ROWS, "0" * 16))
+
+
+def codes(snapshot, rows):
+    return [snapshot.row(i)["NAMASTE_Code"] for i in rows]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["NAMASTE_Code", "Traditional_Term", "Biomedical_Term", "System"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_row_round_trip(snapshot):
+    assert len(snapshot) == len(ROWS)
+    assert snapshot.row(2) == {"NAMASTE_Code": "UN-01", "Traditional_Term": "Humma", "Biomedical_Term": "Pyrexia", "System": "Unani"}
+    assert snapshot.row(5)["Traditional_Term"] == "ज्वरातिसार"
+
+
+def test_find_code(snapshot):
+    assert codes(snapshot, [snapshot.find_code("SI-01")]) == ["SI-01"]
+    assert snapshot.find_code("AY-99") is None
+    assert snapshot.find_code("") is None  # rows without a code are not indexed
+    assert snapshot.find_code("AY-0") is None  # prefixes do not match
+
+
+def test_find_term(snapshot):
+    assert codes(snapshot, [snapshot.find_term("humma")]) == ["UN-01"]
+    assert codes(snapshot, [snapshot.find_term("ज्वरातिसार")]) == ["AY-03"]
+    assert snapshot.find_term("Jvara") is None  # keys are normalized by the caller
+    assert snapshot.find_term("uncoded term") is None
+
+
+def test_find_biomedical_returns_every_row_in_file_order(snapshot):
+    assert codes(snapshot, snapshot.find_biomedical("fever")) == ["AY-01", "SI-01"]
+    assert codes(snapshot, snapshot.find_biomedical("fièvre entérique")) == ["AY-03"]
+    assert snapshot.find_biomedical("cough") == []
+
+
+def test_search(snapshot):
+    assert codes(snapshot, snapshot.search("fever", 10)) == ["AY-01", "SI-01", ""]  # uncoded rows are searchable
+    assert codes(snapshot, snapshot.search("fever", 2)) == ["AY-01", "SI-01"]
+    assert codes(snapshot, snapshot.search("siddha", 10)) == ["SI-01"]
+    assert codes(snapshot, snapshot.search("entérique", 10)) == ["AY-03"]
+    assert codes(snapshot, snapshot.search("ज्वर", 10)) == ["AY-03"]
+    assert snapshot.search("fever\0ayurveda", 10) == []  # separators never match across fields
+    assert snapshot.search("fever", 0) == []
+    assert len(snapshot.search("", 100)) == len(ROWS)
+
+
+def test_narrow_matches_a_fresh_search(snapshot):
+    rows = snapshot.search("a", 100)
+    for q in ("ay", "ayu", "ayurveda", "diab", "zz"):
+        assert snapshot.narrow(rows, q) == snapshot.search(q, 100)
+
+
+def test_duplicate_codes_resolve_to_the_last_row():
+    rows = [dict(ROWS[0]), {**ROWS[1], "NAMASTE_Code": "AY-01"}]
+    snapshot = NamasteSnapshot(build(rows, "0" * 16))
+    assert snapshot.row(snapshot.find_code("AY-01"))["Traditional_Term"] == "Suram"
+
+
+def test_duplicate_terms_resolve_to_the_last_row_unless_first_is_asked_for():
+    rows = [*ROWS, {**ROWS[0], "NAMASTE_Code": "SI-09", "Traditional_Term": "jvara "}]
+    snapshot = NamasteSnapshot(build(rows, "0" * 16))
+    assert snapshot.row(snapshot.find_term("jvara"))["NAMASTE_Code"] == "SI-09"
+    assert snapshot.row(snapshot.find_term("jvara", last=False))["NAMASTE_Code"] == "AY-01"
+    assert snapshot.row(snapshot.find_term("suram", last=False))["NAMASTE_Code"] == "SI-01"
+    assert snapshot.find_term("absent", last=False) is None
+
+
+def test_diagnosis_lookup_takes_the_last_row_of_the_shipped_csv():
+    from core.diagnosis_lookup import get_codes_for_diagnosis
+
+    assert get_codes_for_diagnosis("Pandu")["NAMASTE_Code"] == "SI-BC-01"
+
+
+def test_empty_csv(tmp_path):
+    write_csv(tmp_path / "namaste.csv", [])
+    snapshot = NamasteSnapshot.open(str(tmp_path / "namaste.csv"), str(tmp_path / "namaste.snap"))
+    assert len(snapshot) == 0
+    assert snapshot.find_code("AY-01") is None
+    assert snapshot.find_biomedical("fever") == []
+    assert snapshot.search("", 10) == []
+
+
+def test_missing_csv_gives_an_empty_snapshot(tmp_path):
+    snapshot = NamasteSnapshot.open(str(tmp_path / "absent.csv"), str(tmp_path / "namaste.snap"))
+    assert len(snapshot) == 0
+
+
+def test_stale_snapshot_is_recompiled(tmp_path):
+    csv_path, snap_path = str(tmp_path / "namaste.csv"), str(tmp_path / "namaste.snap")
+    write_csv(csv_path, ROWS[:2])
+    first = NamasteSnapshot.open(csv_path, snap_path)
+    assert len(first) == 2
+
+    write_csv(csv_path, ROWS)
+    second = NamasteSnapshot.open(csv_path, snap_path)
+    assert len(second) == len(ROWS)
+    assert second.version != first.version
+
+
+def test_snapshot_of_another_format_version_is_recompiled(tmp_path):
+    csv_path, snap_path = str(tmp_path / "namaste.csv"), str(tmp_path / "namaste.snap")
+    write_csv(csv_path, ROWS)
+    compile_snapshot(csv_path, snap_path)
+    with open(snap_path, "r+b") as f:
+        f.seek(len(MAGIC))
+        f.write(struct.pack("=I", FORMAT_VERSION - 1))
+
+    snapshot = NamasteSnapshot.open(csv_path, snap_path)
+    assert len(snapshot) == len(ROWS)
+    with open(snap_path, "rb") as f:
+        assert HEADER.unpack_from(f.read(HEADER.size))[1] == FORMAT_VERSION
+
+
+def test_truncated_snapshot_is_recompiled(tmp_path):
+    csv_path, snap_path = str(tmp_path / "namaste.csv"), str(tmp_path / "namaste.snap")
+    write_csv(csv_path, ROWS)
+    (tmp_path / "namaste.snap").write_bytes(b"NMST")
+    assert len(NamasteSnapshot.open(csv_path, snap_path)) == len(ROWS)
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from core import profiling
+from db.database import engine
+
+
+def test_failed_query_does_not_leak_start_time():
+    trace = profiling.RequestTrace()
+    token = profiling._current.set(trace)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            assert conn.info.get("query_started") == []
+            conn.execute(text("SELECT 1"))
+            assert conn.info.get("query_started") == []
+    finally:
+        profiling._current.reset(token)
+    assert trace.counts["db"] == 2
+
+
+def test_profiled_request_is_captured(client, monkeypatch):
+    monkeypatch.setattr(profiling.settings, "PROFILE_SAMPLE_RATE", 1.0)
+    profiling.captured.clear()
+
+    assert client.get("/").status_code == 200
+
+    assert len(profiling.captured) == 1
+    assert profiling.captured[0]["profile"] is not None
@@ -0,0 +1,133 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI, Header
+from fastapi.testclient import TestClient
+
+import main
+from core import ratelimit
+from core.auth import get_current_user
+from core.resilience import ConcurrencyLimiter, RateLimited
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return ratelimit.SQLiteBucketStore(str(tmp_path / "buckets.db"))
+    return ratelimit.MemoryBucketStore()
+
+
+def test_burst_then_limited(store, clock):
+    waits = [store.take("who:alice", rate=1.0, burst=3) for _ in range(4)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(1.0)
+
+
+def test_refills_with_time(store, clock):
+    for _ in range(3):
+        store.take("who:alice", rate=0.5, burst=3)
+    assert store.take("who:alice", rate=0.5, burst=3) > 0
+
+    clock[0] += 2  # one token at 0.5/s
+    assert store.take("who:alice", rate=0.5, burst=3) == 0
+    assert store.take("who:alice", rate=0.5, burst=3) > 0
+
+    clock[0] += 3600  # refill stops at burst
+    assert [store.take("who:alice", rate=0.5, burst=3) for _ in range(4)].count(0) == 3
+
+
+def test_buckets_are_per_key(store, clock):
+    assert store.take("who:alice", rate=1.0, burst=1) == 0
+    assert store.take("who:alice", rate=1.0, burst=1) > 0
+    assert store.take("who:bob", rate=1.0, burst=1) == 0
+    assert store.take("ai:alice", rate=1.0, burst=1) == 0
+
+
+@pytest.fixture
+def limited_client(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "bucket_store", ratelimit.MemoryBucketStore())
+    app = FastAPI()
+    app.exception_handler(RateLimited)(main.rate_limited_handler)
+
+    def user_from_header(x_user: str = Header()):
+        return SimpleNamespace(username=x_user)
+
+    app.dependency_overrides[get_current_user] = user_from_header
+
+    @app.get("/who")
+    def who(user=Depends(ratelimit.rate_limited("who", per_minute=60, burst=2))):
+        return {"user": user.username}
+
+    @app.get("/ai")
+    def ai(user=Depends(ratelimit.rate_limited("ai", per_minute=60, burst=2))):
+        return {"user": user.username}
+
+    return TestClient(app)
+
+
+def test_dependency_returns_429_with_retry_after(limited_client):
+    statuses = [limited_client.get("/who", headers={"X-User": "alice"}).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    res = limited_client.get("/who", headers={"X-User": "alice"})
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_dependency_buckets_per_user_and_scope(limited_client):
+    for _ in range(2):
+        limited_client.get("/who", headers={"X-User": "alice"})
+    assert limited_client.get("/who", headers={"X-User": "alice"}).status_code == 429
+    assert limited_client.get("/who", headers={"X-User": "bob"}).status_code == 200
+    assert limited_client.get("/ai", headers={"X-User": "alice"}).status_code == 200
+
+
+def test_dependency_lets_requests_through_when_store_fails(limited_client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("store down")
+
+    monkeypatch.setattr(ratelimit.bucket_store, "take", broken)
+    assert all(limited_client.get("/who", headers={"X-User": "alice"}).status_code == 200 for _ in range(5))
+
+
+def test_concurrency_limiter_rejects_when_queue_is_full():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queued=0, queue_timeout=1.0)
+    limiter.acquire()
+    with pytest.raises(RateLimited):
+        limiter.acquire()
+    limiter.release()
+    with limiter.slot():
+        assert limiter.in_flight == 1
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_limiter_queue_times_out():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queued=1, queue_timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(RateLimited):
+        limiter.acquire()
+    assert limiter.queued == 0
+
+
+def test_concurrency_limiter_hands_slot_to_waiter():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queued=1, queue_timeout=5.0)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release()
+    assert acquired.wait(1.0)
+    thread.join()
+    assert limiter.in_flight == 1 and limiter.queued == 0
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import utils
+from core.resilience import CircuitBreaker, UpstreamUnavailable
+
+
+def test_breaker_opens_and_lets_one_trial_through():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.0)
+    breaker.record_failure()
+    breaker.before_call()  # still closed
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    breaker.before_call()  # reset_timeout elapsed: the trial call
+    assert breaker.state == "half-open"
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_unexpected_error_during_trial_does_not_wedge_the_circuit(monkeypatch):
+    breaker = CircuitBreaker("who_icd", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    monkeypatch.setattr(utils, "who_breaker", breaker)
+
+    def broken(method, url, **kwargs):
+        raise ValueError("not a requests error")
+
+    monkeypatch.setattr(utils._session, "request", broken)
+    with pytest.raises(ValueError):
+        utils.who_request("entity", "GET", "http://who.test/icd/entity/1")
+    assert breaker.state == "open"
+
+    monkeypatch.setattr(utils._session, "request", lambda method, url, **kwargs: SimpleNamespace(status_code=200))
+    assert utils.who_request("entity", "GET", "http://who.test/icd/entity/1").status_code == 200
+    assert breaker.state == "closed"
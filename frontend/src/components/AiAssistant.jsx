@@ -37,11 +37,13 @@ function AiAssistant() {
   const pollJobStatus = async (id) => {
     try {
       const response = await axios.get(`${BASE_URL}/namaste-job/${id}`);
-      const { status, prompt } = response.data;
+      const { status, result, prompt } = response.data;
       setJobStatus(status);
 
       if (status === 'completed') {
-        if (prompt) {
+        if (Array.isArray(result)) {
+          setAiResults(result);
+        } else if (prompt) {
           try {
             const clean = cleanJsonString(prompt);
             const parsedPrompt = JSON.parse(clean);